@@ -0,0 +1,225 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Configure the app before it is imported: a throwaway SQLite file unless a
+# benchmark database is given, and per-request statement counts in a header
+os.environ["DATABASE_URL"] = os.getenv("BENCH_DATABASE_URL") or "sqlite:///" + os.path.join(
+    tempfile.mkdtemp(), "bench_endpoints.db"
+)
+os.environ["QUERY_COUNT_HEADER"] = "1"
+# Every request comes from one client; the limits would turn the
+# website_form scenario into a measurement of 429s
+os.environ["RATE_LIMIT_ENABLED"] = "0"
+# main.py mounts static/ and templates/ relative to the working directory
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("SLOW_QUERY_THRESHOLD_MS", "1000")
+
+import httpx
+
+import generate_data
+import main
+from query_stats import QUERY_COUNT_HEADER
+
+# Scale presets, in leads; generate_data sizes the other tables from it
+SCALES = {"1k": 1000, "10k": 10000, "100k": 100000, "1m": 1000000}
+DEFAULT_BASELINE = "bench_baseline.json"
+
+# (name, method, path, body). {customer_id}, {project_id} and {lead_id} are
+# filled with a random existing id for every request; {n} in a body string
+# with a number unique to the request, so repeated bodies are not answered
+# from the idempotency cache instead of being written.
+ROUTES = [
+    ("home", "GET", "/", None),
+    ("list_customers", "GET", "/customers/?limit=25", None),
+    ("get_customer", "GET", "/customers/{customer_id}", None),
+    ("customer_projects", "GET", "/customers/{customer_id}/projects", None),
+    ("list_projects", "GET", "/projects/?limit=25", None),
+    ("get_project", "GET", "/projects/{project_id}", None),
+    ("list_vendors", "GET", "/vendors/?limit=25", None),
+    ("list_leads", "GET", "/leads/?limit=25", None),
+    ("list_leads_by_status", "GET", "/leads/?status=NEW&limit=25", None),
+    ("get_lead", "GET", "/leads/{lead_id}", None),
+    ("list_notifications", "GET", "/notifications/?limit=25", None),
+    ("customer_interactions", "GET", "/interactions/customer/{customer_id}?limit=25", None),
+    ("dashboard_stats", "GET", "/api/dashboard/stats", None),
+    ("bootstrap", "GET", "/api/bootstrap?limit=25", None),
+    ("search", "GET", "/search?q=kitchen+remodel", None),
+    ("website_form", "POST", "/api/website-form", {
+        "name": "Bench User", "email": "bench{n}@example.com", "phone": "555-0100",
+        "message": "Kitchen remodel quote {n}", "project_type": "Kitchen", "address": "1 Bench St"
+    }),
+]
+
+
+def seed(leads: int, seed_value: int) -> dict:
+    # The same generator as `python generate_data.py`, one customer per three leads
+    counts = generate_data.generate(customers=max(1, leads // 3), leads=leads, seed=seed_value)
+    print(f"Seeded {sum(counts.values())} rows: {counts}")
+    return counts
+
+
+def route_url(path: str, sizes: dict, rng: random.Random) -> str:
+    return path.format(
+        customer_id=rng.randint(1, sizes["customers"]),
+        project_id=rng.randint(1, sizes["projects"]),
+        lead_id=rng.randint(1, sizes["leads"]),
+    )
+
+
+def route_body(body, n: str):
+    if body is None:
+        return None
+    return {key: value.format(n=n) if isinstance(value, str) else value for key, value in body.items()}
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def bench_route(client, route, sizes: dict, requests: int, concurrency: int, rng: random.Random) -> dict:
+    name, method, path, body = route
+    latencies = []
+    queries = []
+    errors = 0
+    remaining = requests
+    # Also unique across runs against the same BENCH_DATABASE_URL
+    run_id = time.time_ns()
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            url = route_url(path, sizes, rng)
+            payload = route_body(body, f"{run_id}-{remaining}")
+            started = time.perf_counter()
+            response = await client.request(method, url, json=payload)
+            latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(int(response.headers.get(QUERY_COUNT_HEADER, 0)))
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "queries_per_request": round(sum(queries) / len(queries), 2),
+        "error_rate": round(errors / len(latencies), 4),
+    }
+
+
+async def run(sizes: dict, requests: int, concurrency: int, only, rng: random.Random) -> dict:
+    # An unhandled error is counted as a 500, like a real server would answer
+    transport = httpx.ASGITransport(app=main.app, raise_app_exceptions=False)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for route in ROUTES:
+            if only and route[0] not in only:
+                continue
+            results[route[0]] = await bench_route(client, route, sizes, requests, concurrency, rng)
+    return results
+
+
+def print_report(results: dict):
+    print(f"{'route':<24} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8} {'q/req':>6} {'errors':>7}")
+    for name, result in results.items():
+        print(
+            f"{name:<24} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f} "
+            f"{result['throughput_rps']:>8.1f} {result['queries_per_request']:>6.2f} {result['error_rate']:>7.1%}"
+        )
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    # Latency may drift by the tolerance; statement counts and error rates
+    # are deterministic, so any increase is a regression
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        limit = previous["p95_ms"] * (1 + tolerance)
+        if result["p95_ms"] > limit:
+            regressions.append(f"{name}: p95 {result['p95_ms']:.2f} ms > {limit:.2f} ms allowed")
+        if result["queries_per_request"] > previous["queries_per_request"]:
+            regressions.append(
+                f"{name}: {result['queries_per_request']} queries/request, baseline {previous['queries_per_request']}"
+            )
+        if result["error_rate"] > previous["error_rate"]:
+            regressions.append(f"{name}: error rate {result['error_rate']:.1%}, baseline {previous['error_rate']:.1%}")
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the CRM endpoints in-process against a seeded database")
+    parser.add_argument("--scale", choices=SCALES, default="10k", help="seed volume, in leads")
+    parser.add_argument("--requests", type=int, default=200, help="requests per route")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent clients per route")
+    parser.add_argument("--route", action="append", help="only run the named route (repeatable)")
+    parser.add_argument("--seed", type=int, default=42, help="random seed for data and request ids")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline file to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p95 slowdown, as a fraction")
+    parser.add_argument("--output", help="also write the results as JSON to this file")
+    parser.add_argument("--verbose", action="store_true", help="keep the app's logging on")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if not args.verbose:
+        # Failing requests show up in the error column; their tracebacks would bury the report
+        logging.disable(logging.CRITICAL)
+    rng = random.Random(args.seed)
+
+    main.initialize_db()
+    sizes = seed(SCALES[args.scale], args.seed)
+    results = asyncio.run(run(sizes, args.requests, args.concurrency, args.route, rng))
+    print_report(results)
+
+    report = {"scale": args.scale, "concurrency": args.concurrency, "routes": results}
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+
+    failing = [name for name, result in results.items() if result["error_rate"] > 0]
+    if failing:
+        print(f"Requests failed on {', '.join(failing)}; their timings are not the route's")
+    if args.save_baseline and failing:
+        # A failing route looks fast; recording it would excuse the failure
+        print("Not writing a baseline")
+        sys.exit(1)
+    elif args.save_baseline:
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(report, baseline_file, indent=2)
+        print(f"Baseline written to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline.get("scale") != args.scale:
+            print(f"Baseline was recorded at scale {baseline.get('scale')}, not comparing")
+        else:
+            regressions = compare(results, baseline["routes"], args.tolerance)
+            if regressions:
+                print("Regressions against baseline:")
+                for regression in regressions:
+                    print(f"  {regression}")
+                sys.exit(1)
+            print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    else:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one")
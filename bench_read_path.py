@@ -0,0 +1,87 @@
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# Runs against its own throwaway SQLite file, never the configured database
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_read_path.db")
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import insert, select
+from sqlalchemy.orm import selectinload
+
+import lean_reads
+import models
+import schemas
+from database import AsyncSessionLocal, engine
+
+# The schemas still carry pydantic v2's from_attributes; v1 needs orm_mode to
+# validate ORM objects the way the old endpoints did
+for schema in (schemas.Customer, schemas.Project):
+    schema.__config__.orm_mode = True
+
+
+def seed(projects: int):
+    models.Base.metadata.create_all(bind=engine)
+    customers = max(1, projects // 5)
+    with engine.begin() as connection:
+        connection.execute(insert(models.Customer), [
+            {"name": f"Customer {i}", "email": f"customer{i}@example.com", "phone": "555-0100",
+             "address": f"{i} Main St", "is_active": True}
+            for i in range(customers)
+        ])
+        connection.execute(insert(models.Project), [
+            {"name": f"Project {i}", "description": "Kitchen remodel", "status": models.ProjectStatus.PENDING,
+             "customer_id": i % customers + 1, "budget": 25000.0}
+            for i in range(projects)
+        ])
+
+
+async def orm_path(limit: int) -> bytes:
+    # What the endpoints did before: hydrate ORM objects, validate them into
+    # the response model, jsonable_encoder, then json.dumps
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(models.Project).options(selectinload(models.Project.customer)).order_by(models.Project.id).limit(limit)
+        )
+        projects = [schemas.Project.from_orm(project) for project in result.scalars().all()]
+        return JSONResponse(jsonable_encoder(projects)).body
+
+
+async def lean_path(limit: int) -> bytes:
+    async with AsyncSessionLocal() as db:
+        view = lean_reads.PROJECTS
+        result = await db.execute(view.select().order_by(models.Project.id).limit(limit))
+        return lean_reads.lean_response(view.rows(result)).body
+
+
+async def measure(path, limit: int, rounds: int) -> float:
+    await path(limit)  # warm up connection pool and statement caches
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        await path(limit)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+async def main(limits, rounds: int):
+    # Both paths must produce the same document before their speed matters
+    assert json.loads(await orm_path(50)) == json.loads(await lean_path(50))
+    print(f"{'limit':>6} {'orm ms':>9} {'lean ms':>9} {'speedup':>8}")
+    for limit in limits:
+        orm_ms = await measure(orm_path, limit, rounds)
+        lean_ms = await measure(lean_path, limit, rounds)
+        print(f"{limit:>6} {orm_ms:>9.2f} {lean_ms:>9.2f} {orm_ms / lean_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    # python bench_read_path.py [rounds]
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    limits = [10, 100, 1000, 5000]
+    seed(max(limits))
+    asyncio.run(main(limits, rounds))
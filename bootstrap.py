@@ -0,0 +1,67 @@
+import itertools
+import operator
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import dashboard_stats
+import lean_reads
+import models
+from pagination import encode_cursor, paginate
+
+# Upper bound on the page size a client may ask for
+MAX_BOOTSTRAP_LIMIT = 100
+
+
+def next_cursor(rows, limit: int):
+    # Same rule as the X-Next-Cursor header of the list endpoints
+    return encode_cursor(rows[-1].id) if rows and len(rows) == limit else None
+
+
+async def first_page(db: AsyncSession, view: lean_reads.LeanView, limit: int) -> list:
+    return view.rows(await db.execute(paginate(view.select(), view.model, limit=limit)))
+
+
+async def initial_view(db: AsyncSession, limit: int) -> dict:
+    # Everything the dashboard shows on load, in eight statements whatever
+    # the page size: the first page of every list, the projects of the
+    # listed customers in one IN query, and the counters
+    limit = max(1, min(limit, MAX_BOOTSTRAP_LIMIT))
+    customers = await first_page(db, lean_reads.CUSTOMER_DETAIL, limit)
+    projects = await first_page(db, lean_reads.PROJECTS, limit)
+    vendors = await first_page(db, lean_reads.VENDORS, limit)
+    leads = await first_page(db, lean_reads.LEADS, limit)
+    notifications = lean_reads.with_project_customers(await first_page(db, lean_reads.NOTIFICATIONS, limit))
+    interactions = lean_reads.with_project_customers(await first_page(db, lean_reads.INTERACTIONS, limit))
+
+    # Grouped in Python from one ordered scan of ix_projects_customer_id_id,
+    # for the customer/project pickers that used to ask once per customer
+    by_customer = {customer.id: customer for customer in customers}
+    for customer in customers:
+        customer.projects = []
+    if by_customer:
+        view = lean_reads.PROJECT_ROWS
+        result = await db.execute(
+            view.select()
+            .filter(models.Project.customer_id.in_(by_customer))
+            .order_by(models.Project.customer_id, models.Project.id)
+        )
+        for customer_id, rows in itertools.groupby(view.rows(result), key=operator.attrgetter("customer_id")):
+            by_customer[customer_id].projects = list(rows)
+
+    return {
+        "customers": customers,
+        "projects": projects,
+        "vendors": vendors,
+        "leads": leads,
+        "notifications": notifications,
+        "interactions": interactions,
+        "stats": await dashboard_stats.read_dashboard_stats(db),
+        "next_cursors": {
+            "customers": next_cursor(customers, limit),
+            "projects": next_cursor(projects, limit),
+            "vendors": next_cursor(vendors, limit),
+            "leads": next_cursor(leads, limit),
+            "notifications": next_cursor(notifications, limit),
+            "interactions": next_cursor(interactions, limit)
+        }
+    }
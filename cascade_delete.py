@@ -0,0 +1,59 @@
+import logging
+from typing import List
+
+from sqlalchemy import delete, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import dashboard_stats
+import models
+
+logger = logging.getLogger(__name__)
+
+# Deletes customers and everything hanging off them with a fixed number of
+# set-based statements, whatever the number of customers or related rows.
+# Children are matched through subqueries on the customer ids, so no rows are
+# loaded into Python and the result does not depend on the database enforcing
+# ON DELETE CASCADE (SQLite leaves foreign keys off by default).
+async def delete_customers(db: AsyncSession, customer_ids: List[int]) -> int:
+    customer_ids = list(set(customer_ids))
+    if not customer_ids:
+        return 0
+
+    await dashboard_stats.remove_customers(db, customer_ids)
+
+    project_ids = select(models.Project.id).where(models.Project.customer_id.in_(customer_ids)).scalar_subquery()
+
+    await db.execute(
+        delete(models.Notification).where(or_(
+            models.Notification.customer_id.in_(customer_ids),
+            models.Notification.project_id.in_(project_ids)
+        )).execution_options(synchronize_session=False)
+    )
+    await db.execute(
+        delete(models.Interaction).where(or_(
+            models.Interaction.customer_id.in_(customer_ids),
+            models.Interaction.project_id.in_(project_ids)
+        )).execution_options(synchronize_session=False)
+    )
+    await db.execute(
+        delete(models.VendorProject).where(
+            models.VendorProject.project_id.in_(project_ids)
+        ).execution_options(synchronize_session=False)
+    )
+    await db.execute(
+        delete(models.Lead).where(
+            models.Lead.converted_to_customer_id.in_(customer_ids)
+        ).execution_options(synchronize_session=False)
+    )
+    await db.execute(
+        delete(models.Project).where(
+            models.Project.customer_id.in_(customer_ids)
+        ).execution_options(synchronize_session=False)
+    )
+    result = await db.execute(
+        delete(models.Customer).where(
+            models.Customer.id.in_(customer_ids)
+        ).execution_options(synchronize_session=False)
+    )
+    logger.info(f"Deleted {result.rowcount} customers with their related records")
+    return result.rowcount
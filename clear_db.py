@@ -1,27 +1,24 @@
-from sqlalchemy.orm import Session
-from database import engine
-import models
+import logging
+import sys
 
-# Create a new session
-session = Session(bind=engine)
+from db_reset import PURGEABLE, purge_older_than, reset_database
+
+# python clear_db.py                  empty every table
+# python clear_db.py --vacuum         ...and reclaim the space (SQLite)
+# python clear_db.py leads 90         delete leads older than 90 days
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 try:
-    # Delete all records from each table in the correct order (to handle foreign key constraints)
-    print("Clearing database entries...")
-    
-    # Clear projects first since they depend on customers
-    print("Clearing projects...")
-    session.query(models.Project).delete()
-    
-    # Then clear customers
-    print("Clearing customers...")
-    session.query(models.Customer).delete()
-    
-    # Commit the changes
-    session.commit()
-    print("Successfully cleared all entries from the database.")
+    args = sys.argv[1:]
+    if args and args[0] in PURGEABLE:
+        entity, days = args[0], int(args[1])
+        print(f"Purging {entity} older than {days} days...")
+        purged = purge_older_than(entity, days)
+        print(f"Purged {purged} {entity}.")
+    else:
+        print("Clearing database entries...")
+        reset_database(vacuum="--vacuum" in args)
+        print("Successfully cleared all entries from the database.")
 except Exception as e:
-    session.rollback()
     print(f"An error occurred: {e}")
-finally:
-    session.close()
+    sys.exit(1)
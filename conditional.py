@@ -0,0 +1,89 @@
+import datetime
+import email.utils
+import hashlib
+from typing import NamedTuple, Optional
+
+from fastapi import Request, Response
+
+# Clients may keep responses but must revalidate before each use
+CACHE_CONTROL = "no-cache"
+
+
+class Validators(NamedTuple):
+    etag: str
+    last_modified: Optional[datetime.datetime]
+
+
+def make_validators(*parts, last_modified: Optional[datetime.datetime] = None) -> Validators:
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()[:20]
+    return Validators(f'"{digest}"', last_modified)
+
+
+def row_version(row) -> Optional[datetime.datetime]:
+    # updated_at is only set once a row has been modified
+    return getattr(row, "updated_at", None) or getattr(row, "created_at", None)
+
+
+def nested_rows(row) -> list:
+    values = [getattr(row, name) for name in getattr(row, "__slots__", ())]
+    return [value for value in values if hasattr(value, "id")]
+
+
+def row_versions(rows) -> list:
+    return [
+        (type(item).__name__, item.id, row_version(item))
+        for row in rows
+        for item in [row, *nested_rows(row)]
+    ]
+
+
+# Detail responses: the version of every row in the body, nested ones included
+def row_validators(*rows) -> Validators:
+    versions = row_versions(rows)
+    stamps = [version for _, _, version in versions if version is not None]
+    return make_validators(*versions, last_modified=max(stamps, default=None))
+
+
+# List responses: the page parameters plus the id and version of every row on
+# the page, nested ones included, taken from the page already fetched. An
+# insert, edit or delete changes the tag only if it changes what the page
+# shows. No Last-Modified: a row dropping off the page can leave the newest
+# version where it was, and If-Modified-Since would then answer 304.
+def page_validators(rows, *page) -> Validators:
+    return make_validators(*page, *row_versions(rows))
+
+
+def http_date(value: datetime.datetime) -> str:
+    return email.utils.format_datetime(value.replace(tzinfo=datetime.timezone.utc, microsecond=0), usegmt=True)
+
+
+def is_not_modified(request: Request, validators: Validators) -> bool:
+    # If-None-Match wins over If-Modified-Since when both are sent (RFC 7232)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or validators.etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and validators.last_modified:
+        try:
+            since = email.utils.parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=datetime.timezone.utc)
+        modified = validators.last_modified.replace(tzinfo=datetime.timezone.utc, microsecond=0)
+        return modified <= since
+    return False
+
+
+def apply_validators(response: Response, validators: Validators) -> Response:
+    response.headers["ETag"] = validators.etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    if validators.last_modified:
+        response.headers["Last-Modified"] = http_date(validators.last_modified)
+    return response
+
+
+def not_modified_response(validators: Validators) -> Response:
+    return apply_validators(Response(status_code=304), validators)
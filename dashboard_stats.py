@@ -0,0 +1,151 @@
+import enum
+import logging
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+import models
+from database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+LEADS = "leads"
+CUSTOMERS = "customers"
+PROJECTS = "projects"
+
+# Customers have no status column; the counter splits them on is_active
+CUSTOMER_ACTIVE = "ACTIVE"
+CUSTOMER_INACTIVE = "INACTIVE"
+
+KNOWN_STATUSES = {
+    LEADS: [status.value for status in models.LeadStatus],
+    CUSTOMERS: [CUSTOMER_ACTIVE, CUSTOMER_INACTIVE],
+    PROJECTS: [status.value for status in models.ProjectStatus],
+}
+
+
+def status_key(status) -> str:
+    if isinstance(status, enum.Enum):
+        return status.value
+    return str(status)
+
+
+def customer_status(is_active) -> str:
+    # is_active is still None on a customer that has not been flushed yet
+    return CUSTOMER_INACTIVE if is_active is False else CUSTOMER_ACTIVE
+
+
+# Counter updates run on the caller's session, so they commit or roll back
+# together with the write they describe
+async def adjust_counter(db: AsyncSession, entity: str, status, delta: int):
+    key = status_key(status)
+    result = await db.execute(
+        update(models.DashboardCounter)
+        .where(models.DashboardCounter.entity == entity, models.DashboardCounter.status == key)
+        .values(count=models.DashboardCounter.count + delta)
+    )
+    if result.rowcount == 0:
+        # Only reached for statuses the rebuild did not seed
+        await db.execute(
+            insert(models.DashboardCounter).values(entity=entity, status=key, count=delta)
+        )
+
+
+async def move_counter(db: AsyncSession, entity: str, old_status, new_status):
+    if status_key(old_status) == status_key(new_status):
+        return
+    await adjust_counter(db, entity, old_status, -1)
+    await adjust_counter(db, entity, new_status, 1)
+
+
+async def remove_customers(db: AsyncSession, customer_ids):
+    # Subtract customers together with the projects and converted leads that
+    # are deleted alongside them; call before the rows are gone
+    customer_counts = await db.execute(
+        select(models.Customer.is_active, func.count(models.Customer.id))
+        .where(models.Customer.id.in_(customer_ids))
+        .group_by(models.Customer.is_active)
+    )
+    for is_active, count in customer_counts.all():
+        await adjust_counter(db, CUSTOMERS, customer_status(is_active), -count)
+
+    project_counts = await db.execute(
+        select(models.Project.status, func.count(models.Project.id))
+        .where(models.Project.customer_id.in_(customer_ids))
+        .group_by(models.Project.status)
+    )
+    for status, count in project_counts.all():
+        await adjust_counter(db, PROJECTS, status, -count)
+
+    lead_counts = await db.execute(
+        select(models.Lead.status, func.count(models.Lead.id))
+        .where(models.Lead.converted_to_customer_id.in_(customer_ids))
+        .group_by(models.Lead.status)
+    )
+    for status, count in lead_counts.all():
+        await adjust_counter(db, LEADS, status, -count)
+
+
+async def read_dashboard_stats(db: AsyncSession) -> dict:
+    result = await db.execute(
+        select(models.DashboardCounter.entity, models.DashboardCounter.status, models.DashboardCounter.count)
+    )
+    counts = {LEADS: {}, CUSTOMERS: {}, PROJECTS: {}}
+    for entity, status, count in result:
+        counts.setdefault(entity, {})[status] = count
+
+    return {
+        "leads": {
+            "total": sum(counts[LEADS].values()),
+            "converted": counts[LEADS].get(models.LeadStatus.CONVERTED.value, 0)
+        },
+        "customers": {
+            "total": sum(counts[CUSTOMERS].values()),
+            "active": counts[CUSTOMERS].get(CUSTOMER_ACTIVE, 0)
+        },
+        "projects": {
+            "total": sum(counts[PROJECTS].values()),
+            "active": counts[PROJECTS].get(models.ProjectStatus.IN_PROGRESS.value, 0)
+        }
+    }
+
+
+# Recount everything from the base tables. Used after seeding, after bulk
+# clears, and to repair drift if a counter ever disagrees with the data.
+def rebuild_counters(db: Session):
+    counts = {
+        entity: {status: 0 for status in statuses}
+        for entity, statuses in KNOWN_STATUSES.items()
+    }
+
+    for status, count in db.query(models.Lead.status, func.count(models.Lead.id)).group_by(models.Lead.status):
+        counts[LEADS][status_key(status)] = count
+    for is_active, count in db.query(models.Customer.is_active, func.count(models.Customer.id)).group_by(models.Customer.is_active):
+        counts[CUSTOMERS][customer_status(is_active)] += count
+    for status, count in db.query(models.Project.status, func.count(models.Project.id)).group_by(models.Project.status):
+        counts[PROJECTS][status_key(status)] = count
+
+    db.query(models.DashboardCounter).delete()
+    db.add_all([
+        models.DashboardCounter(entity=entity, status=status, count=count)
+        for entity, statuses in counts.items()
+        for status, count in statuses.items()
+    ])
+    db.commit()
+    logger.info(f"Rebuilt dashboard counters: {counts}")
+    return counts
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    session = SessionLocal()
+    try:
+        print("Rebuilding dashboard counters...")
+        rebuild_counters(session)
+        print("Dashboard counters rebuilt.")
+    except Exception as e:
+        session.rollback()
+        print(f"An error occurred: {e}")
+    finally:
+        session.close()
@@ -1,5 +1,7 @@
 import os
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import logging
@@ -77,9 +79,60 @@ except Exception as e:
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Async engine for the request handlers, pointed at the same database through
+# asyncpg (PostgreSQL) or aiosqlite (SQLite fallback)
+def get_async_database_url(url):
+    async_url = make_url(url)
+    connect_args = {}
+    if async_url.drivername in ("postgresql", "postgresql+psycopg2"):
+        async_url = async_url.set(drivername="postgresql+asyncpg")
+        # asyncpg does not understand libpq's sslmode, it takes an ssl argument instead
+        sslmode = async_url.query.get("sslmode")
+        if sslmode:
+            async_url = async_url.difference_update_query(["sslmode"])
+            connect_args["ssl"] = sslmode
+    elif async_url.drivername in ("sqlite", "sqlite+pysqlite"):
+        async_url = async_url.set(drivername="sqlite+aiosqlite")
+    return async_url, connect_args
+
+try:
+    ASYNC_DATABASE_URL, async_connect_args = get_async_database_url(DATABASE_URL)
+    if ASYNC_DATABASE_URL.drivername == "postgresql+asyncpg":
+        async_engine = create_async_engine(
+            ASYNC_DATABASE_URL,
+            pool_size=5,
+            max_overflow=10,
+            pool_timeout=30,
+            pool_pre_ping=True,
+            pool_recycle=300,
+            connect_args=async_connect_args
+        )
+        logger.info("Created async PostgreSQL engine (asyncpg)")
+    else:
+        async_engine = create_async_engine(ASYNC_DATABASE_URL, connect_args=async_connect_args)
+        logger.info("Created async SQLite engine (aiosqlite)")
+except Exception as e:
+    logger.error(f"Async database engine error: {str(e)}")
+    logger.error(f"Full traceback: {traceback.format_exc()}")
+    raise
+
+# expire_on_commit=False so handlers can still read attributes of committed
+# objects without an implicit (and, under asyncio, illegal) lazy refresh
+AsyncSessionLocal = sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autocommit=False,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,75 @@
+import datetime
+import logging
+
+from sqlalchemy import delete, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+import dashboard_stats
+import models
+import search_index  # the SQLite drop/recreate path relies on its metadata hooks
+from database import engine
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PURGE_CHUNK_SIZE = 5000
+
+# Entities that can be purged by age, and the column that ages them
+PURGEABLE = {
+    "leads": (models.Lead, models.Lead.created_at),
+    "interactions": (models.Interaction, models.Interaction.created_at),
+    "notifications": (models.Notification, models.Notification.created_at),
+}
+
+
+# Empties every application table. schema_migrations is not part of the
+# models' metadata, so the recorded schema version survives.
+def reset_database(bind: Engine = engine, vacuum: bool = False):
+    if bind.dialect.name == "postgresql":
+        # One statement, no per-row WAL, and sequences start again at 1
+        tables = ", ".join(table.name for table in models.Base.metadata.sorted_tables)
+        with bind.begin() as connection:
+            connection.exec_driver_sql(f"TRUNCATE {tables} RESTART IDENTITY CASCADE")
+            dashboard_stats.rebuild_counters(Session(bind=connection))
+    else:
+        # Dropping the tables avoids firing the search index triggers once per
+        # row; create_all brings back the tables, index and triggers
+        with bind.begin() as connection:
+            models.Base.metadata.drop_all(bind=connection)
+            models.Base.metadata.create_all(bind=connection)
+            dashboard_stats.rebuild_counters(Session(bind=connection))
+        if vacuum:
+            # VACUUM cannot run inside a transaction
+            with bind.connect() as connection:
+                connection.execution_options(isolation_level="AUTOCOMMIT").exec_driver_sql("VACUUM")
+    logger.info("Database reset")
+
+
+# Deletes rows older than the cutoff a chunk at a time, each chunk in its own
+# short transaction, so a large purge never holds locks for long
+def purge_older_than(
+    entity: str,
+    days: int,
+    bind: Engine = engine,
+    chunk_size: int = DEFAULT_PURGE_CHUNK_SIZE
+) -> int:
+    model, age_column = PURGEABLE[entity]
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=days)
+    purged = 0
+
+    while True:
+        with bind.begin() as connection:
+            ids = connection.execute(
+                select(model.id).where(age_column < cutoff).order_by(model.id).limit(chunk_size)
+            ).scalars().all()
+            if not ids:
+                break
+            connection.execute(delete(model).where(model.id.in_(ids)))
+        purged += len(ids)
+        logger.info(f"Purged {purged} {entity} so far")
+
+    if purged and entity == "leads":
+        with bind.begin() as connection:
+            dashboard_stats.rebuild_counters(Session(bind=connection))
+    logger.info(f"Purged {purged} {entity} older than {days} days")
+    return purged
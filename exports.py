@@ -0,0 +1,98 @@
+import csv
+import datetime
+import enum
+import io
+import json
+import logging
+import os
+import zlib
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import or_, select
+
+import models
+from database import async_engine
+
+logger = logging.getLogger(__name__)
+
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "1000"))
+
+EXPORT_MODELS = {
+    "customers": models.Customer,
+    "projects": models.Project,
+    "leads": models.Lead,
+    "interactions": models.Interaction,
+}
+
+FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def export_value(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return value
+
+
+def export_query(model, updated_since: Optional[datetime.datetime] = None):
+    # Plain columns only: rows are encoded straight from the cursor, never hydrated into ORM objects
+    query = select(*model.__table__.columns).order_by(model.id)
+    if updated_since:
+        query = query.where(or_(model.updated_at >= updated_since, model.created_at >= updated_since))
+    return query
+
+
+def encode_csv(columns, rows, header: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(columns)
+    writer.writerows([export_value(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+
+def encode_ndjson(columns, rows, header: bool) -> str:
+    return "".join(
+        json.dumps({column: export_value(value) for column, value in zip(columns, row)}) + "\n"
+        for row in rows
+    )
+
+
+async def stream_export(
+    entity: str,
+    export_format: str = "csv",
+    updated_since: Optional[datetime.datetime] = None,
+    compress: bool = False
+) -> AsyncIterator[bytes]:
+    model = EXPORT_MODELS[entity]
+    encode = encode_csv if export_format == "csv" else encode_ndjson
+    columns = [column.name for column in model.__table__.columns]
+    compressor = zlib.compressobj(wbits=31) if compress else None  # wbits=31 writes a gzip container
+
+    # A dedicated connection streaming through a server-side cursor, so only
+    # one chunk of rows is held in memory no matter how big the table is
+    async with async_engine.connect() as connection:
+        result = await connection.stream(
+            export_query(model, updated_since).execution_options(stream_results=True, max_row_buffer=EXPORT_CHUNK_ROWS)
+        )
+        header = True
+        exported = 0
+        async for rows in result.partitions(EXPORT_CHUNK_ROWS):
+            data = encode(columns, rows, header).encode()
+            header = False
+            exported += len(rows)
+            if compressor:
+                data = compressor.compress(data)
+            if data:
+                yield data
+        if header and export_format == "csv":
+            # Empty export still gets a header row
+            data = encode(columns, [], True).encode()
+            yield compressor.compress(data) if compressor else data
+        if compressor:
+            yield compressor.flush()
+    logger.info(f"Exported {exported} {entity}")
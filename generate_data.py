@@ -0,0 +1,495 @@
+import argparse
+import bisect
+import csv
+import datetime
+import io
+import itertools
+import logging
+import math
+import random
+import sys
+import time
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+import dashboard_stats
+import migrations
+import models
+import reminders
+import search_index
+from database import engine
+from db_reset import reset_database
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 10000
+# Customers are generated this many at a time together with everything that
+# hangs off them, so memory stays flat whatever the requested volume
+CUSTOMER_BLOCK_SIZE = 5000
+HISTORY_DAYS = 3 * 365
+
+FIRST_NAMES = [
+    "James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David", "Elizabeth",
+    "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Carlos", "Karen",
+    "Daniel", "Lisa", "Matthew", "Nancy", "Anthony", "Maria", "Mark", "Sandra", "Wei", "Ashley", "Luis", "Priya",
+]
+LAST_NAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+    "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin",
+    "Lee", "Perez", "Thompson", "White", "Harris", "Sanchez", "Clark", "Ramirez", "Lewis", "Robinson", "Nguyen",
+]
+# (first, last, full name, email local part), worked out once rather than per row
+PEOPLE = [
+    (first, last, f"{first} {last}", f"{first.lower()}.{last.lower()}")
+    for first in FIRST_NAMES for last in LAST_NAMES
+]
+EMAIL_DOMAINS = ["example.com", "example.net", "example.org", "mail.example.com"]
+STREETS = ["Main St", "Oak Ave", "Pine Rd", "Maple Dr", "Cedar Ln", "Elm St", "Lakeview Dr", "Hillcrest Rd", "Park Ave"]
+CITIES = ["Springfield", "Riverside", "Franklin", "Greenville", "Fairview", "Madison", "Georgetown", "Salem"]
+PROJECT_TYPES = [
+    "Kitchen Remodel", "Bathroom Remodel", "Roof Replacement", "Deck Construction", "Basement Finishing",
+    "Home Addition", "Window Replacement", "Siding Repair", "Garage Build", "Exterior Painting", "Flooring Install",
+]
+PROJECT_DETAILS = [
+    "custom cabinets", "new fixtures", "permit required", "structural work", "matching existing finish",
+    "energy efficient materials", "tight timeline", "HOA approval needed", "water damage repair", "open floor plan",
+]
+TRADES = [
+    "Plumbing", "Electrical", "Roofing", "HVAC", "Framing", "Drywall", "Painting", "Concrete",
+    "Landscaping", "Flooring", "Lumber Supply", "Windows & Doors", "Cabinetry", "Excavation",
+]
+INTERACTION_TYPES = ["call", "email", "site_visit", "meeting"]
+INTERACTION_NOTES = [
+    "Discussed scope and budget", "Sent revised estimate", "Walked the site with the client",
+    "Client asked about schedule", "Followed up on change order", "Confirmed material selections",
+    "Left voicemail", "Reviewed final punch list", "Scheduled inspection",
+]
+
+# (value, weight) tables for the categorical columns
+PROJECTS_PER_CUSTOMER = [(0, 20), (1, 45), (2, 20), (3, 10), (4, 5)]
+VENDORS_PER_PROJECT = [(0, 15), (1, 30), (2, 30), (3, 17), (4, 8)]
+NOTIFICATIONS_PER_PROJECT = [(0, 30), (1, 40), (2, 20), (3, 10)]
+INTERACTION_TYPE_WEIGHTS = [("call", 45), ("email", 35), ("site_visit", 12), ("meeting", 8)]
+LEAD_SOURCES = [
+    (models.LeadSource.WEBSITE, 40), (models.LeadSource.REFERRAL, 25), (models.LeadSource.SOCIAL_MEDIA, 15),
+    (models.LeadSource.ADVERTISEMENT, 12), (models.LeadSource.OTHER, 8),
+]
+# Leads move through the funnel with age: recent ones are mostly still open,
+# old ones have mostly been won, lost or converted
+RECENT_LEAD_STATUSES = [
+    (models.LeadStatus.NEW, 40), (models.LeadStatus.CONTACTED, 30), (models.LeadStatus.QUALIFIED, 15),
+    (models.LeadStatus.PROPOSAL, 10), (models.LeadStatus.NEGOTIATION, 5),
+]
+OLD_LEAD_STATUSES = [
+    (models.LeadStatus.NEW, 5), (models.LeadStatus.CONTACTED, 10), (models.LeadStatus.QUALIFIED, 8),
+    (models.LeadStatus.PROPOSAL, 6), (models.LeadStatus.NEGOTIATION, 3), (models.LeadStatus.WON, 6),
+    (models.LeadStatus.LOST, 47), (models.LeadStatus.CONVERTED, 15),
+]
+RECENT_PROJECT_STATUSES = [
+    (models.ProjectStatus.PENDING, 35), (models.ProjectStatus.IN_PROGRESS, 45),
+    (models.ProjectStatus.COMPLETED, 15), (models.ProjectStatus.CANCELLED, 5),
+]
+OLD_PROJECT_STATUSES = [
+    (models.ProjectStatus.PENDING, 2), (models.ProjectStatus.IN_PROGRESS, 10),
+    (models.ProjectStatus.COMPLETED, 78), (models.ProjectStatus.CANCELLED, 10),
+]
+OPEN_LEAD_STATUSES = {
+    models.LeadStatus.NEW, models.LeadStatus.CONTACTED, models.LeadStatus.QUALIFIED,
+    models.LeadStatus.PROPOSAL, models.LeadStatus.NEGOTIATION,
+}
+VENDOR_ASSIGNMENT_STATUS = {
+    models.ProjectStatus.PENDING: "quoted",
+    models.ProjectStatus.IN_PROGRESS: "active",
+    models.ProjectStatus.COMPLETED: "completed",
+    models.ProjectStatus.CANCELLED: "cancelled",
+}
+
+# Column order of the generated row tuples
+COLUMNS = {
+    "customers": ["id", "name", "email", "phone", "address", "is_active", "created_at"],
+    "vendors": ["id", "name", "contact_name", "email", "phone", "services", "created_at"],
+    "projects": [
+        "id", "name", "description", "status", "customer_id", "created_at",
+        "start_date", "end_date", "budget", "revenue",
+    ],
+    "vendor_projects": ["id", "vendor_id", "project_id", "role", "start_date", "end_date", "status"],
+    "interactions": ["id", "customer_id", "project_id", "interaction_type", "notes", "created_at"],
+    "notifications": [
+        "id", "title", "description", "type", "customer_id", "project_id", "due_date", "created_at", "is_read",
+    ],
+    "leads": [
+        "id", "name", "email", "phone", "address", "source", "status", "notes", "project_type", "description",
+        "last_contact", "next_follow_up", "expected_value", "created_at", "converted_at", "converted_to_customer_id",
+    ],
+}
+TABLES = {
+    "customers": models.Customer.__table__,
+    "vendors": models.Vendor.__table__,
+    "projects": models.Project.__table__,
+    "vendor_projects": models.VendorProject.__table__,
+    "interactions": models.Interaction.__table__,
+    "notifications": models.Notification.__table__,
+    "leads": models.Lead.__table__,
+}
+
+
+class Weighted:
+    # rng.choices with the cumulative weights worked out once
+    def __init__(self, rng: random.Random, pairs):
+        self.rng = rng
+        self.values = [value for value, _ in pairs]
+        self.cum_weights = list(itertools.accumulate(weight for _, weight in pairs))
+
+    def __call__(self):
+        return self.values[bisect.bisect(self.cum_weights, self.rng.random() * self.cum_weights[-1])]
+
+
+class TableWriter:
+    # Buffers generated rows and writes them a chunk at a time: COPY on
+    # PostgreSQL, otherwise one executemany of the compiled Core insert with
+    # plain tuples, skipping the per-row dict building and type processing
+    # that dominate an ORM or dict-based bulk insert
+    def __init__(self, connection: Connection, name: str, chunk_size: int):
+        self.connection = connection
+        self.name = name
+        self.table = TABLES[name]
+        self.columns = COLUMNS[name]
+        self.chunk_size = chunk_size
+        self.rows = []
+        self.written = 0
+        self.copy = connection.dialect.name == "postgresql"
+        self.statement = str(insert(self.table).compile(dialect=connection.dialect, column_keys=self.columns))
+        # SQLAlchemy's Enum type turns members into the stored strings; both paths bypass it
+        self.enum_values = {
+            member: stored
+            for column in self.table.columns
+            if getattr(column.type, "enum_class", None) is not None
+            for member, stored in zip(column.type.enum_class, column.type.enums)
+        }
+        self.enum_positions = [
+            position for position, column in enumerate(self.columns)
+            if getattr(self.table.c[column].type, "enum_class", None) is not None
+        ]
+
+    def add(self, row: tuple):
+        self.rows.append(row)
+        if len(self.rows) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        rows = self.rows
+        if self.enum_positions:
+            enum_values = self.enum_values
+            positions = self.enum_positions
+            rows = [list(row) for row in rows]
+            for row in rows:
+                for position in positions:
+                    row[position] = enum_values[row[position]]
+        if self.copy:
+            self.copy_rows(rows)
+        else:
+            self.connection.exec_driver_sql(self.statement, [tuple(row) for row in rows])
+        self.written += len(self.rows)
+        self.rows = []
+
+    def copy_rows(self, rows):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        # The raw psycopg2 connection underneath the open transaction
+        cursor = self.connection.connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {self.name} ({', '.join(self.columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+            )
+        finally:
+            cursor.close()
+
+
+class DataGenerator:
+    def __init__(self, connection: Connection, seed: int, as_of: datetime.datetime, chunk_size: int):
+        self.rng = random.Random(seed)
+        self.random = self.rng.random
+        self.as_of = as_of
+        self.history_start = as_of - datetime.timedelta(days=HISTORY_DAYS)
+        self.writers = {name: TableWriter(connection, name, chunk_size) for name in COLUMNS}
+        # New rows continue after whatever is already there, so the generator can top up a database
+        self.next_ids = {
+            name: (connection.execute(select(func.max(table.c.id))).scalar() or 0) + 1
+            for name, table in TABLES.items()
+        }
+        rng = self.rng
+        self.projects_per_customer = Weighted(rng, PROJECTS_PER_CUSTOMER)
+        self.vendors_per_project = Weighted(rng, VENDORS_PER_PROJECT)
+        self.notifications_per_project = Weighted(rng, NOTIFICATIONS_PER_PROJECT)
+        self.interaction_type = Weighted(rng, INTERACTION_TYPE_WEIGHTS)
+        self.lead_source = Weighted(rng, LEAD_SOURCES)
+        self.recent_lead_status = Weighted(rng, RECENT_LEAD_STATUSES)
+        self.old_lead_status = Weighted(rng, OLD_LEAD_STATUSES)
+        self.recent_project_status = Weighted(rng, RECENT_PROJECT_STATUSES)
+        self.old_project_status = Weighted(rng, OLD_PROJECT_STATUSES)
+        self.vendor_ids = []
+        self.vendor_trades = []
+        self.vendor_cum_weights = []
+
+    def next_id(self, name: str) -> int:
+        row_id = self.next_ids[name]
+        self.next_ids[name] = row_id + 1
+        return row_id
+
+    def growth_date(self, index: int, count: int) -> datetime.datetime:
+        # The business grows over the history window: the cumulative share of
+        # rows created by time t is (t / window)^2, so ids stay in created_at
+        # order and recent months are busier than old ones
+        fraction = math.sqrt((index + self.rng.random()) / count)
+        return self.history_start + datetime.timedelta(days=HISTORY_DAYS * fraction)
+
+    def after(self, start: datetime.datetime, mean_days: float) -> datetime.datetime:
+        moment = start + datetime.timedelta(days=self.rng.expovariate(1 / mean_days))
+        return min(moment, self.as_of)
+
+    def pick(self, values):
+        # rng.choice does rejection sampling on top of getrandbits; scaling one
+        # float is several times cheaper, which matters at millions of rows
+        return values[int(self.random() * len(values))]
+
+    def phone(self) -> str:
+        return f"555-{int(self.random() * 10000):04d}"
+
+    def address(self) -> str:
+        return f"{int(self.random() * 9998) + 1} {self.pick(STREETS)}, {self.pick(CITIES)}"
+
+    def money(self, median: float, spread: float = 0.9) -> float:
+        return round(self.rng.lognormvariate(math.log(median), spread), -2)
+
+    def generate_vendors(self, count: int):
+        writer = self.writers["vendors"]
+        for index in range(count):
+            vendor_id = self.next_id("vendors")
+            first, last, name, local = self.pick(PEOPLE)
+            trade = self.pick(TRADES)
+            writer.add((
+                vendor_id, f"{last} {trade}", name, f"office{vendor_id}@{last.lower()}-{index}.example.com",
+                self.phone(), trade, self.growth_date(index, count),
+            ))
+            self.vendor_ids.append(vendor_id)
+            self.vendor_trades.append(trade)
+        # A few vendors get most of the work: weight the k-th one 1/k
+        self.vendor_cum_weights = list(itertools.accumulate(1 / rank for rank in range(1, count + 1)))
+        writer.flush()
+
+    def pick_vendor(self) -> int:
+        index = bisect.bisect(self.vendor_cum_weights, self.rng.random() * self.vendor_cum_weights[-1])
+        return min(index, len(self.vendor_ids) - 1)
+
+    def generate_customers(self, count: int):
+        for block_start in range(0, count, CUSTOMER_BLOCK_SIZE):
+            for index in range(block_start, min(count, block_start + CUSTOMER_BLOCK_SIZE)):
+                self.generate_customer(index, count)
+            # Parents before children, so PostgreSQL's foreign keys are satisfied
+            for name in ("customers", "projects", "vendor_projects", "interactions", "notifications"):
+                self.writers[name].flush()
+
+    def generate_customer(self, index: int, count: int):
+        rng = self.rng
+        customer_id = self.next_id("customers")
+        created_at = self.growth_date(index, count)
+        first, last, name, local = self.pick(PEOPLE)
+        self.writers["customers"].add((
+            customer_id, name, f"{local}{customer_id}@{self.pick(EMAIL_DOMAINS)}",
+            self.phone(), self.address(), rng.random() < 0.92, created_at,
+        ))
+
+        project_ids = [
+            self.generate_project(customer_id, created_at)
+            for _ in range(self.projects_per_customer())
+        ]
+
+        # Interactions are geometric around four per customer, most of them about one of their projects
+        interactions = self.writers["interactions"]
+        for _ in range(int(rng.expovariate(1 / 4))):
+            project_id = self.pick(project_ids) if project_ids and rng.random() < 0.7 else None
+            interactions.add((
+                self.next_id("interactions"), customer_id, project_id, self.interaction_type(),
+                self.pick(INTERACTION_NOTES), self.after(created_at, 120),
+            ))
+
+    def generate_project(self, customer_id: int, customer_created: datetime.datetime) -> int:
+        rng = self.rng
+        project_id = self.next_id("projects")
+        created_at = self.after(customer_created, 30)
+        age_days = (self.as_of - created_at).days
+        status = self.old_project_status() if age_days > 180 else self.recent_project_status()
+        start = self.after(created_at, 14)
+        end = start + datetime.timedelta(days=max(3, int(rng.lognormvariate(math.log(45), 0.6))))
+        budget = self.money(35000)
+        if status == models.ProjectStatus.COMPLETED:
+            revenue = round(budget * rng.uniform(0.9, 1.2), 2)
+        elif status == models.ProjectStatus.IN_PROGRESS:
+            revenue = round(budget * rng.uniform(0.1, 0.7), 2)
+        else:
+            revenue = 0.0
+        project_type = self.pick(PROJECT_TYPES)
+        self.writers["projects"].add((
+            project_id, project_type, f"{project_type}: {self.pick(PROJECT_DETAILS)}, {self.pick(PROJECT_DETAILS)}",
+            status, customer_id, created_at, start.date(),
+            end.date() if status != models.ProjectStatus.CANCELLED else None, budget, revenue,
+        ))
+
+        if self.vendor_ids:
+            vendor_projects = self.writers["vendor_projects"]
+            assignment_status = VENDOR_ASSIGNMENT_STATUS[status]
+            for vendor_index in {self.pick_vendor() for _ in range(self.vendors_per_project())}:
+                vendor_projects.add((
+                    self.next_id("vendor_projects"), self.vendor_ids[vendor_index], project_id,
+                    self.vendor_trades[vendor_index], start, end, assignment_status,
+                ))
+
+        notifications = self.writers["notifications"]
+        for _ in range(self.notifications_per_project()):
+            due_date = start + datetime.timedelta(days=rng.uniform(-7, 90))
+            if status == models.ProjectStatus.COMPLETED and rng.random() < 0.5:
+                notification_type, title = models.NotificationType.COMPLETION, f"{project_type} completed"
+            elif rng.random() < 0.6:
+                notification_type, title = models.NotificationType.PROJECT_MILESTONE, f"{project_type} milestone"
+            else:
+                notification_type, title = models.NotificationType.TASK_REMINDER, f"{project_type}: {self.pick(TRADES)} walkthrough"
+            notifications.add((
+                self.next_id("notifications"), title, self.pick(PROJECT_DETAILS), notification_type,
+                customer_id, project_id, due_date, created_at, due_date < self.as_of and rng.random() < 0.85,
+            ))
+        return project_id
+
+    def generate_leads(self, count: int, customer_ids: range):
+        rng = self.rng
+        writer = self.writers["leads"]
+        for index in range(count):
+            lead_id = self.next_id("leads")
+            created_at = self.growth_date(index, count)
+            recent = (self.as_of - created_at).days <= 30
+            status = self.recent_lead_status() if recent else self.old_lead_status()
+            first, last, name, local = self.pick(PEOPLE)
+            project_type = self.pick(PROJECT_TYPES)
+
+            last_contact = None if status == models.LeadStatus.NEW else self.after(created_at, 5)
+            next_follow_up = None
+            if status in OPEN_LEAD_STATUSES:
+                # Mostly upcoming; the overdue tail comes due as soon as it
+                # is loaded, as it would through the API
+                next_follow_up = reminders.follow_up_time(self.as_of + datetime.timedelta(days=rng.uniform(-10, 21)))
+            converted_at = converted_to = None
+            if status == models.LeadStatus.CONVERTED and customer_ids:
+                converted_at = self.after(created_at, 20)
+                converted_to = self.pick(customer_ids)
+
+            writer.add((
+                lead_id, name, f"{local}{lead_id}@{self.pick(EMAIL_DOMAINS)}",
+                self.phone() if rng.random() < 0.8 else None, self.address() if rng.random() < 0.7 else None,
+                self.lead_source(), status, f"Interested in {project_type.lower()}", project_type,
+                self.pick(PROJECT_DETAILS), last_contact, next_follow_up, self.money(25000), created_at,
+                converted_at, converted_to,
+            ))
+        writer.flush()
+
+
+def reset_sequences(connection: Connection):
+    # Rows were written with explicit ids; move each serial past them
+    for name in TABLES:
+        connection.exec_driver_sql(
+            f"SELECT setval(pg_get_serial_sequence('{name}', 'id'), COALESCE((SELECT MAX(id) FROM {name}), 0) + 1, false)"
+        )
+
+
+def generate(
+    bind: Engine = engine,
+    customers: int = 10000,
+    leads: int = None,
+    vendors: int = None,
+    seed: int = 42,
+    as_of: datetime.datetime = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> dict:
+    # The same seed and as_of always produce the same rows, overdue follow-up
+    # times aside; as_of defaults to today's midnight so a seed is stable for
+    # the whole day
+    leads = customers * 3 if leads is None else leads
+    vendors = max(10, customers // 50) if vendors is None else vendors
+    as_of = as_of or datetime.datetime.combine(datetime.date.today(), datetime.time())
+    started = time.perf_counter()
+
+    with bind.begin() as connection:
+        first_customer_id = (connection.execute(select(func.max(models.Customer.id))).scalar() or 0) + 1
+        # Indexing row by row through the triggers would dominate the load on
+        # SQLite; the index is rebuilt in one pass at the end instead
+        search_index.drop_search_triggers(connection)
+
+        # Secondary indexes are likewise built once over the loaded rows rather
+        # than maintained through millions of single-row inserts
+        indexes = [index for table in TABLES.values() for index in table.indexes]
+        for index in indexes:
+            index.drop(bind=connection, checkfirst=True)
+
+        generator = DataGenerator(connection, seed, as_of, chunk_size)
+        generator.generate_vendors(vendors)
+        generator.generate_customers(customers)
+        generator.generate_leads(leads, range(first_customer_id, first_customer_id + customers))
+        loaded = time.perf_counter()
+
+        for index in indexes:
+            index.create(bind=connection)
+
+        if connection.dialect.name == "postgresql":
+            reset_sequences(connection)
+        search_index.create_search_index(connection)
+        dashboard_stats.rebuild_counters(Session(bind=connection))
+        connection.exec_driver_sql("ANALYZE")
+
+    counts = {name: writer.written for name, writer in generator.writers.items()}
+    total = sum(counts.values())
+    load_seconds = loaded - started
+    logger.info(
+        f"Generated {total} rows in {load_seconds:.1f}s ({total / load_seconds:,.0f} rows/s), "
+        f"indexes and counters rebuilt in {time.perf_counter() - loaded:.1f}s: {counts}"
+    )
+    return counts
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Fill the CRM database with synthetic, internally consistent data")
+    parser.add_argument("--customers", type=int, default=10000, help="customers to generate (projects, "
+                        "interactions, notifications and vendor assignments fan out from them)")
+    parser.add_argument("--leads", type=int, help="leads to generate (default: 3 per customer)")
+    parser.add_argument("--vendors", type=int, help="vendors to generate (default: 1 per 50 customers, at least 10)")
+    parser.add_argument("--seed", type=int, default=42, help="random seed")
+    parser.add_argument("--as-of", type=datetime.date.fromisoformat, help="date the data ends at, YYYY-MM-DD (default: today)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="rows per insert batch")
+    parser.add_argument("--reset", action="store_true", help="empty the database first")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    # python generate_data.py --customers 1000000 --reset
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = parse_args()
+    try:
+        with migrations.startup_lock():
+            migrations.run_migrations()
+        if args.reset:
+            reset_database()
+        counts = generate(
+            customers=args.customers,
+            leads=args.leads,
+            vendors=args.vendors,
+            seed=args.seed,
+            as_of=datetime.datetime.combine(args.as_of, datetime.time()) if args.as_of else None,
+            chunk_size=args.chunk_size,
+        )
+        for name, count in counts.items():
+            print(f"{name:<16} {count:>10,}")
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        sys.exit(1)
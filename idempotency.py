@@ -0,0 +1,162 @@
+import asyncio
+import collections
+import hashlib
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+import orjson
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+import schemas
+
+logger = logging.getLogger(__name__)
+
+# Set on answers that repeat an earlier one instead of writing anything
+REPLAYED_HEADER = "Idempotent-Replayed"
+# How long a client-supplied Idempotency-Key is remembered
+IDEMPOTENCY_KEY_TTL_HOURS = float(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "24"))
+# Without a key, an identical submission within this window is a duplicate
+# (a double click, a browser retry); after it, a repeat inquiry
+IDEMPOTENCY_WINDOW_SECONDS = float(os.getenv("IDEMPOTENCY_WINDOW_SECONDS", "600"))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+# Expired rows are deleted at most this often per process, as part of a write
+PURGE_INTERVAL_SECONDS = 300
+
+CLIENT_KEY_PREFIX = "key:"
+PAYLOAD_KEY_PREFIX = "form:"
+
+
+class ExpiringLRU:
+    # Bounded in-process map: least recently used entries go first, and an
+    # entry given a ttl reads as missing once it has expired
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+            del self.entries[key]
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, value, ttl: Optional[float] = None):
+        if ttl is not None and ttl <= 0:
+            return
+        self.entries[key] = (value, None if ttl is None else time.monotonic() + ttl)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def discard(self, key):
+        self.entries.pop(key, None)
+
+    def stats(self) -> dict:
+        return {"size": len(self.entries), "hits": self.hits, "misses": self.misses}
+
+
+def request_key(client_key: Optional[str], form_data: schemas.WebsiteFormData) -> str:
+    # Hashed either way: fixed length, and nothing a client sends ends up in
+    # the key table verbatim
+    if client_key:
+        return CLIENT_KEY_PREFIX + hashlib.sha256(client_key.strip().encode()).hexdigest()
+    payload = form_data.dict()
+    payload["email"] = payload["email"].strip().lower()
+    return PAYLOAD_KEY_PREFIX + hashlib.sha256(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+def key_expires_at(key: str, now: datetime) -> datetime:
+    if key.startswith(CLIENT_KEY_PREFIX):
+        return now + timedelta(hours=IDEMPOTENCY_KEY_TTL_HOURS)
+    return now + timedelta(seconds=IDEMPOTENCY_WINDOW_SECONDS)
+
+
+class IdempotencyStore:
+    # Answers already given, by key. The LRU catches duplicates reaching this
+    # process without touching the database; the idempotency_keys table,
+    # written in the same transaction as the lead, catches the rest (other
+    # workers, restarts).
+
+    def __init__(self, cache_size: int = IDEMPOTENCY_CACHE_SIZE):
+        self.cache = ExpiringLRU(cache_size)
+        # Keys being handled right now, so a double click waits for the
+        # first request's answer instead of racing it
+        self.in_flight: Dict[str, asyncio.Event] = {}
+        self.replayed = 0
+        self.last_purge = time.monotonic()
+
+    async def claim(self, key: str) -> Optional[Tuple[int, dict]]:
+        # The earlier (status code, body) for a duplicate. Otherwise the key
+        # is this request's until release().
+        while True:
+            answer = self.cache.get(key)
+            if answer is not None:
+                self.replayed += 1
+                return answer
+            pending = self.in_flight.get(key)
+            if pending is None:
+                break
+            await pending.wait()
+        self.in_flight[key] = asyncio.Event()
+        return None
+
+    def release(self, key: str, answer: Optional[Tuple[int, dict]] = None):
+        # Without an answer (the request failed) waiting duplicates go ahead
+        # and try for themselves
+        if answer is not None:
+            now = datetime.utcnow()
+            self.cache.put(key, answer, ttl=(key_expires_at(key, now) - now).total_seconds())
+        pending = self.in_flight.pop(key, None)
+        if pending is not None:
+            pending.set()
+
+    async def stored(self, db: AsyncSession, keys: Iterable[str]) -> Dict[str, Optional[int]]:
+        # Lead ids of keys another worker (or this one, before a restart) wrote
+        result = await db.execute(
+            select(models.IdempotencyKey.key, models.IdempotencyKey.lead_id).where(
+                models.IdempotencyKey.key.in_(set(keys)),
+                models.IdempotencyKey.expires_at > datetime.utcnow()
+            )
+        )
+        return dict(result.all())
+
+    def record(self, db: AsyncSession, key: str, lead_id: int, now: datetime):
+        db.add(models.IdempotencyKey(key=key, lead_id=lead_id, created_at=now, expires_at=key_expires_at(key, now)))
+
+    async def purge_expired(self, db: AsyncSession, now: datetime, keys: Optional[Iterable[str]] = None):
+        # An expired key left in the table makes the next use of that key
+        # fail on the primary key, so expired rows are cleared regularly,
+        # and right away for given keys that just did
+        condition = models.IdempotencyKey.expires_at <= now
+        if keys is not None:
+            condition = condition & models.IdempotencyKey.key.in_(set(keys))
+        elif time.monotonic() - self.last_purge < PURGE_INTERVAL_SECONDS:
+            return
+        else:
+            self.last_purge = time.monotonic()
+        result = await db.execute(delete(models.IdempotencyKey).where(condition))
+        if result.rowcount:
+            logger.info(f"Purged {result.rowcount} expired idempotency keys")
+
+    def clear(self):
+        # The answers name lead ids, which mean nothing after a reset
+        self.cache.entries.clear()
+
+    def stats(self) -> dict:
+        return {"replayed": self.replayed, "in_flight": len(self.in_flight), "cache": self.cache.stats()}
+
+
+store = IdempotencyStore()
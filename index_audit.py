@@ -0,0 +1,124 @@
+import argparse
+import asyncio
+import logging
+import random
+import re
+import sys
+
+# Must come first: points the app at the benchmark database before it is imported
+import bench_endpoints
+
+import httpx
+from sqlalchemy import event
+
+import main
+import models
+from database import async_engine
+from slow_queries import explain
+
+# Endpoints beyond the benchmark's that run interesting queries. The audit
+# database is a throwaway, so destructive ones are fine.
+EXTRA_ROUTES = [
+    ("list_unread_notifications", "GET", "/notifications/?unread_only=true&limit=25", None),
+    ("delete_project", "DELETE", "/projects/{project_id}", None),
+    ("delete_customer", "DELETE", "/customers/{customer_id}", None),
+]
+
+# Fixed-size tables, where a scan is as cheap as any index lookup
+SMALL_TABLES = {"dashboard_counters"}
+
+TABLE_NAMES = set(models.Base.metadata.tables)
+SQLITE_SCAN = re.compile(r"^SCAN (\w+)")
+POSTGRES_SCAN = re.compile(r"Seq Scan on (\w+)")
+
+
+def full_scans(statement: str, plan: str) -> list:
+    # An unfiltered read walking the table in index order and stopping at its
+    # LIMIT (the first page of a list) only touches the rows it returns
+    bounded = (
+        re.search(r"\bLIMIT\b", statement, re.IGNORECASE) is not None
+        and re.search(r"\bWHERE\b", statement, re.IGNORECASE) is None
+        and "TEMP B-TREE" not in plan
+        and "Sort" not in plan
+    )
+    tables = []
+    for line in plan.splitlines():
+        line = line.strip()
+        match = SQLITE_SCAN.match(line) or POSTGRES_SCAN.search(line)
+        if not match or "VIRTUAL TABLE" in line:
+            continue
+        # Eager loads alias tables as customers_1, projects_2, ...
+        table = re.sub(r"_\d+$", "", match.group(1))
+        if table in TABLE_NAMES and table not in SMALL_TABLES and not bounded:
+            tables.append(table)
+    return tables
+
+
+class PlanCollector:
+    # Explains every statement the app runs while a route is being audited
+    def __init__(self):
+        self.route = None
+        self.plans = []
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self.route is None or executemany:
+            return
+        # Plain EXPLAIN only, never ANALYZE: writes must not run twice
+        plan = explain(conn, statement, parameters, analyze=False)
+        if plan is not None:
+            self.plans.append((self.route, statement, plan))
+
+
+async def audit(routes, sizes: dict, rng: random.Random, collector: PlanCollector):
+    transport = httpx.ASGITransport(app=main.app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://audit") as client:
+        for name, method, path, body in routes:
+            collector.route = name
+            response = await client.request(method, bench_endpoints.route_url(path, sizes, rng), json=body)
+            collector.route = None
+            if response.status_code >= 400:
+                print(f"warning: {name} answered {response.status_code}, its plans may be incomplete")
+
+
+def report(plans, verbose: bool) -> int:
+    failures = 0
+    for route, statement, plan in plans:
+        scans = full_scans(statement, plan)
+        if scans:
+            failures += len(scans)
+            print(f"FULL SCAN {route}: {', '.join(scans)}")
+        if scans or verbose:
+            print(f"    {' '.join(statement.split())[:300]}")
+            for line in plan.splitlines():
+                print(f"    | {line}")
+    return failures
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="EXPLAIN every query the endpoints run and flag full table scans")
+    parser.add_argument("--scale", choices=bench_endpoints.SCALES, default="1k", help="seed volume, in leads")
+    parser.add_argument("--route", action="append", help="only audit the named route (repeatable)")
+    parser.add_argument("--seed", type=int, default=42, help="random seed for data and request ids")
+    parser.add_argument("--verbose", action="store_true", help="print every plan, not only flagged ones")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    # python index_audit.py                 audit a freshly generated database
+    # BENCH_DATABASE_URL=... python index_audit.py   audit an existing one (it gets seeded too)
+    args = parse_args()
+    logging.disable(logging.CRITICAL)
+    main.initialize_db()
+    sizes = bench_endpoints.seed(bench_endpoints.SCALES[args.scale], args.seed)
+
+    routes = [
+        route for route in bench_endpoints.ROUTES + EXTRA_ROUTES
+        if not args.route or route[0] in args.route
+    ]
+    collector = PlanCollector()
+    event.listen(async_engine.sync_engine, "before_cursor_execute", collector.before_cursor_execute)
+    asyncio.run(audit(routes, sizes, random.Random(args.seed), collector))
+
+    failures = report(collector.plans, args.verbose)
+    print(f"Explained {len(collector.plans)} statements across {len(routes)} routes, {failures} unexpected full scan(s)")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,188 @@
+import codecs
+import csv
+import datetime
+import enum
+import json
+import logging
+import os
+from collections import Counter
+from typing import AsyncIterator, List, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import dashboard_stats
+import models
+import reminders
+import schemas
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = int(os.getenv("LEAD_IMPORT_BATCH_SIZE", "1000"))
+MAX_BATCH_SIZE = 10000
+
+CSV_TYPES = ("text/csv", "application/csv")
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+# Columns written by the importer; everything else comes from column defaults
+COPY_COLUMNS = list(schemas.LeadCreate.__fields__) + ["created_at"]
+
+
+class RecordError(ValueError):
+    pass
+
+
+# Upload parsing. CSV and NDJSON bodies are consumed line by line as they
+# arrive, so memory is bounded by the batch size rather than the upload size.
+async def iter_lines(stream) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in stream:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+async def iter_ndjson_records(stream):
+    async for line in iter_lines(stream):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield RecordError(f"Invalid JSON: {e}")
+
+
+async def iter_csv_records(stream):
+    header = None
+    logical_line = ""
+    async for line in iter_lines(stream):
+        # A quoted field may span several physical lines; escaped quotes come in
+        # pairs, so an odd quote count means the record is not finished yet
+        logical_line = f"{logical_line}\n{line}" if logical_line else line
+        if logical_line.count('"') % 2:
+            continue
+        record_line, logical_line = logical_line.rstrip("\r"), ""
+        if not record_line.strip():
+            continue
+        values = next(csv.reader([record_line]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield RecordError(f"Expected {len(header)} columns, got {len(values)}")
+            continue
+        # Empty cells mean "not provided" so optional fields fall back to their defaults
+        yield {name: value for name, value in zip(header, values) if value != ""}
+    if logical_line:
+        yield RecordError("Unterminated quoted field")
+
+
+async def iter_json_records(records):
+    for record in records:
+        yield record
+
+
+def parse_lead(record) -> schemas.LeadCreate:
+    if isinstance(record, RecordError):
+        raise record
+    if not isinstance(record, dict):
+        raise RecordError("Expected an object")
+    return schemas.LeadCreate(**record)
+
+
+def lead_row(lead: schemas.LeadCreate, created_at: datetime.datetime) -> dict:
+    row = lead.dict()
+    row["next_follow_up"] = reminders.follow_up_time(row["next_follow_up"])
+    row["created_at"] = created_at
+    return row
+
+
+def copy_value(value):
+    # SQLAlchemy's Enum type persists member names; COPY bypasses it
+    if isinstance(value, enum.Enum):
+        return value.name
+    return value
+
+
+async def write_rows(db: AsyncSession, rows: List[dict]):
+    if db.bind.dialect.name == "postgresql":
+        # COPY through the asyncpg connection underneath the session's transaction
+        connection = await db.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            models.Lead.__tablename__,
+            records=[tuple(copy_value(row[column]) for column in COPY_COLUMNS) for row in rows],
+            columns=COPY_COLUMNS
+        )
+    else:
+        # A list of parameter sets runs as a single executemany
+        await db.execute(insert(models.Lead), rows)
+
+
+async def flush_batch(db: AsyncSession, batch: List[Tuple[int, dict]], results: list) -> int:
+    rows = [row for _, row in batch]
+    try:
+        await write_rows(db, rows)
+        for status, count in Counter(row["status"] for row in rows).items():
+            await dashboard_stats.adjust_counter(db, dashboard_stats.LEADS, status, count)
+        await db.commit()
+        results.extend({"row": row_number, "status": "created"} for row_number, _ in batch)
+        return len(batch)
+    except Exception as e:
+        await db.rollback()
+        logger.warning(f"Lead batch of {len(batch)} failed ({str(e)}), retrying row by row")
+
+    # Slow path: isolate the rows the database rejects without losing the rest
+    created = 0
+    for row_number, row in batch:
+        try:
+            await db.execute(insert(models.Lead), [row])
+            await dashboard_stats.adjust_counter(db, dashboard_stats.LEADS, row["status"], 1)
+            await db.commit()
+            results.append({"row": row_number, "status": "created"})
+            created += 1
+        except Exception as e:
+            await db.rollback()
+            results.append({"row": row_number, "status": "failed", "errors": [str(e)]})
+    return created
+
+
+async def import_leads(db: AsyncSession, records, batch_size: int = DEFAULT_BATCH_SIZE) -> dict:
+    results = []
+    batch = []
+    total = created = 0
+    created_at = datetime.datetime.utcnow()
+
+    async for record in records:
+        total += 1
+        try:
+            lead = parse_lead(record)
+        except ValidationError as e:
+            results.append({"row": total, "status": "failed", "errors": e.errors()})
+            continue
+        except RecordError as e:
+            results.append({"row": total, "status": "failed", "errors": [str(e)]})
+            continue
+
+        batch.append((total, lead_row(lead, created_at)))
+        if len(batch) >= batch_size:
+            created += await flush_batch(db, batch, results)
+            batch = []
+
+    if batch:
+        created += await flush_batch(db, batch, results)
+
+    results.sort(key=lambda result: result["row"])
+    logger.info(f"Imported {created} of {total} leads")
+    return {
+        "total": total,
+        "created": created,
+        "failed": total - created,
+        "results": results
+    }
@@ -0,0 +1,80 @@
+import dataclasses
+from typing import List, Optional
+
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import LABEL_STYLE_TABLENAME_PLUS_COL, select
+
+import models
+import schemas
+
+
+class LeanView:
+    # Read-only projection of a model in the shape of its response schema.
+    # Selects just the schema's columns with Core, builds slotted dataclasses
+    # straight from the row tuples, and lets orjson encode them natively, so
+    # list endpoints skip ORM identity-map bookkeeping and pydantic validation.
+
+    def __init__(self, model, schema, nested: Optional[dict] = None, extra: Optional[List[str]] = None):
+        self.model = model
+        self.columns = [column for column in model.__table__.columns if column.name in schema.__fields__]
+        self.nested = nested or {}  # relationship name -> LeanView of a many-to-one target
+        self.id_index = [column.name for column in self.columns].index("id")
+        fields = [column.name for column in self.columns]
+        fields += [(name, object, dataclasses.field(default=None)) for name in [*self.nested, *(extra or [])]]
+        self.row_type = dataclasses.make_dataclass(f"{schema.__name__}Row", fields, slots=True)
+
+    def select(self):
+        columns = list(self.columns)
+        for view in self.nested.values():
+            columns += view.columns
+        # Table-prefixed labels keep customers.id apart from projects.id
+        query = select(*columns).set_label_style(LABEL_STYLE_TABLENAME_PLUS_COL)
+        for name, view in self.nested.items():
+            query = query.outerjoin(view.model, getattr(self.model, name))
+        return query
+
+    def build(self, row):
+        width = len(self.columns)
+        nested = {}
+        for name, view in self.nested.items():
+            values = row[width:width + len(view.columns)]
+            width += len(view.columns)
+            # Outer join misses come back as all-NULL columns
+            nested[name] = view.row_type(*values) if values[view.id_index] is not None else None
+        return self.row_type(*row[:len(self.columns)], **nested)
+
+    def rows(self, result) -> list:
+        return [self.build(row) for row in result]
+
+
+CUSTOMERS = LeanView(models.Customer, schemas.Customer)
+CUSTOMER_DETAIL = LeanView(models.Customer, schemas.CustomerWithProjects, extra=["projects"])
+PROJECTS = LeanView(models.Project, schemas.Project, nested={"customer": CUSTOMERS})
+VENDORS = LeanView(models.Vendor, schemas.Vendor)
+LEADS = LeanView(models.Lead, schemas.Lead)
+# Project columns alone, for nesting under rows that already name the customer
+PROJECT_ROWS = LeanView(models.Project, schemas.Project)
+# Under a notification or interaction the project's customer is filled in
+# by with_project_customers rather than joined a second time
+NESTED_PROJECTS = LeanView(models.Project, schemas.Project, extra=["customer"])
+NOTIFICATIONS = LeanView(
+    models.Notification, schemas.Notification, nested={"customer": CUSTOMERS, "project": NESTED_PROJECTS}
+)
+INTERACTIONS = LeanView(
+    models.Interaction, schemas.Interaction, nested={"customer": CUSTOMERS, "project": NESTED_PROJECTS}
+)
+
+
+def with_project_customers(rows: list) -> list:
+    # A notification or interaction is about one of its customer's projects,
+    # so the customer already on the row is the project's too
+    for row in rows:
+        if row.project is not None and row.customer is not None and row.project.customer_id == row.customer.id:
+            row.project.customer = row.customer
+    return rows
+
+
+def lean_response(content, status_code: int = 200) -> ORJSONResponse:
+    # Returned as-is, so FastAPI skips response_model validation; the
+    # response_model on the route still documents the shape
+    return ORJSONResponse(content, status_code=status_code)
@@ -0,0 +1,166 @@
+import asyncio
+import collections
+import logging
+import os
+import uuid
+from typing import NamedTuple, Optional
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+# Events a client may fall behind by before it is cut off
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "100"))
+# Recent events kept for clients resuming with Last-Event-ID
+EVENT_HISTORY_SIZE = int(os.getenv("EVENT_HISTORY_SIZE", "1000"))
+# Comment lines keep proxies from closing an idle stream
+EVENT_KEEPALIVE_SECONDS = float(os.getenv("EVENT_KEEPALIVE_SECONDS", "15"))
+# How long the browser waits before reconnecting, in milliseconds
+EVENT_RETRY_MS = 3000
+
+# Sent instead of a replay when the missed events are gone: after a restart,
+# from another worker process, or older than the history. Clients reload.
+RESYNC = "resync"
+
+
+class Event(NamedTuple):
+    id: str
+    type: str
+    data: bytes
+
+
+class Subscriber:
+    def __init__(self, queue_size: int):
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def offer(self, event: Optional[Event]):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Never block a publisher on a slow client: drop what it has not
+            # read and end its stream. The browser reconnects with its
+            # Last-Event-ID and catches up from the history.
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class EventHub:
+    # In-process pub/sub. Event ids are "<epoch>-<sequence>"; the epoch is
+    # new for every process, so a Last-Event-ID from before a restart or from
+    # another worker is recognised and answered with a resync.
+
+    def __init__(self, queue_size: int = EVENT_QUEUE_SIZE, history_size: int = EVENT_HISTORY_SIZE):
+        self.epoch = uuid.uuid4().hex[:8]
+        self.sequence = 0
+        self.queue_size = queue_size
+        self.history = collections.deque(maxlen=history_size)
+        self.subscribers = set()
+        self.published = 0
+        self.disconnected_slow = 0
+
+    def publish(self, event_type: str, data: dict) -> Event:
+        self.sequence += 1
+        event = Event(f"{self.epoch}-{self.sequence}", event_type, orjson.dumps(data))
+        self.history.append((self.sequence, event))
+        self.published += 1
+        for subscriber in self.subscribers:
+            subscriber.offer(event)
+        return event
+
+    def missed_events(self, last_event_id: str):
+        epoch, _, sequence = last_event_id.partition("-")
+        if epoch != self.epoch or not sequence.isdigit():
+            return None
+        sequence = int(sequence)
+        if sequence > self.sequence:
+            return None
+        oldest = self.history[0][0] if self.history else self.sequence + 1
+        if sequence + 1 < oldest:
+            return None
+        return [event for event_sequence, event in self.history if event_sequence > sequence]
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> Subscriber:
+        subscriber = Subscriber(self.queue_size)
+        if last_event_id:
+            missed = self.missed_events(last_event_id)
+            if missed is None or len(missed) >= self.queue_size:
+                subscriber.offer(Event(f"{self.epoch}-{self.sequence}", RESYNC, b"{}"))
+            else:
+                for event in missed:
+                    subscriber.offer(event)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+        if subscriber.overflowed:
+            self.disconnected_slow += 1
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self.subscribers),
+            "published": self.published,
+            "last_event_id": f"{self.epoch}-{self.sequence}",
+            "history": len(self.history),
+            "disconnected_slow": self.disconnected_slow
+        }
+
+
+hub = EventHub()
+
+
+def publish(event_type: str, data: dict):
+    # Call after the commit: clients react by refetching, and must see the change
+    try:
+        hub.publish(event_type, data)
+    except Exception as e:
+        logger.error(f"Error publishing {event_type} event: {str(e)}")
+
+
+def lead_event(lead) -> dict:
+    return {
+        "id": lead.id,
+        "name": lead.name,
+        "email": lead.email,
+        "source": lead.source,
+        "status": lead.status,
+        "created_at": lead.created_at
+    }
+
+
+def notification_event(notification) -> dict:
+    return {
+        "id": notification.id,
+        "title": notification.title,
+        "type": notification.type,
+        "customer_id": notification.customer_id,
+        "project_id": notification.project_id,
+        "due_date": notification.due_date
+    }
+
+
+def format_event(event: Event) -> bytes:
+    return b"id: " + event.id.encode() + b"\nevent: " + event.type.encode() + b"\ndata: " + event.data + b"\n\n"
+
+
+async def stream(subscriber: Subscriber):
+    # The stream ends when the client disconnects (Starlette cancels it) or
+    # when it fell too far behind; either way it leaves the hub
+    try:
+        yield f"retry: {EVENT_RETRY_MS}\n\n".encode()
+        while True:
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), timeout=EVENT_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+            if event is None:
+                return
+            yield format_event(event)
+    finally:
+        hub.unsubscribe(subscriber)
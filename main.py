@@ -1,19 +1,43 @@
-from fastapi import FastAPI, Depends, HTTPException, Request, Header
+from fastapi import FastAPI, Depends, HTTPException, Request, Header, Response, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
-from starlette.responses import FileResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import FileResponse, StreamingResponse
 from starlette.types import Scope, Receive, Send
 from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 import models, schemas
-from database import engine, get_db, SessionLocal
+from database import engine, async_engine, get_db, get_async_db, SessionLocal
+from pagination import decode_cursor, paginate, set_next_cursor
+import dashboard_stats
+import lead_import
+import exports
+import website_intake
+import idempotency
+import search_index
+import migrations
+import seed_data
+import cascade_delete
+import db_reset
+import lean_reads
+import bootstrap
+import query_stats
+import metrics
+import slow_queries
+import conditional
+import static_assets
+import live_events
+import reminders
+import rate_limits
 import traceback
 from datetime import datetime, timedelta
 from pydantic import BaseModel
 import logging
 import json
-from sqlalchemy import func
+from sqlalchemy import func, select, delete
 import os
 from dotenv import load_dotenv
 import uvicorn
@@ -29,76 +53,30 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Create database tables
-def initialize_db(db: Session):
+SEED_SAMPLE_DATA = os.getenv("SEED_SAMPLE_DATA", "").lower() in ("1", "true", "yes")
+
+# Bring the schema up to date. Restarts against a current database are a
+# single version lookup; sample rows are only added when explicitly asked for.
+def initialize_db():
     try:
-        logger.info("Creating database tables...")
-        # Drop all existing tables first to recreate with new schema
-        models.Base.metadata.drop_all(bind=engine)
-        models.Base.metadata.create_all(bind=engine)
-        
-        logger.info("Checking if database is empty...")
-        
-        try:
-            # Create sample customers
-            customer1 = models.Customer(
-                name="John Doe",
-                email="john@example.com",
-                phone="555-0101",
-                address="123 Main St"
-            )
-            customer2 = models.Customer(
-                name="Jane Smith",
-                email="jane@example.com",
-                phone="555-0102",
-                address="456 Oak Ave"
-            )
-            db.add_all([customer1, customer2])
-            db.commit()
-            logger.info("Added sample customers")
-            
-            # Create sample projects
-            project1 = models.Project(
-                name="Kitchen Renovation",
-                description="Full kitchen remodel",
-                status=models.ProjectStatus.IN_PROGRESS,
-                customer_id=customer1.id
-            )
-            project2 = models.Project(
-                name="Bathroom Update",
-                description="Master bathroom renovation",
-                status=models.ProjectStatus.PENDING,
-                customer_id=customer2.id
-            )
-            db.add_all([project1, project2])
-            db.commit()
-            logger.info("Added sample projects")
-            
-            # Create sample leads
-            lead1 = models.Lead(
-                name="Bob Wilson",
-                email="bob@example.com",
-                phone="555-0103",
-                address="789 Pine Rd",
-                source=models.LeadSource.WEBSITE,
-                status=models.LeadStatus.NEW,
-                notes="Interested in kitchen remodel"
-            )
-            db.add(lead1)
-            db.commit()
-            logger.info("Added sample lead")
-            
-        except Exception as sample_data_error:
-            logger.error(f"Error adding sample data: {str(sample_data_error)}")
-            db.rollback()
-            raise
-        
+        # With several workers only the lock holder does any work; the others
+        # wait for it and then see an up-to-date schema
+        with migrations.startup_lock(engine):
+            migrations.run_migrations(engine)
+
+            if SEED_SAMPLE_DATA:
+                db = SessionLocal()
+                try:
+                    seed_data.seed_sample_data(db)
+                finally:
+                    db.close()
+
     except Exception as init_error:
         logger.error(f"Database initialization error: {str(init_error)}")
         logger.error(traceback.format_exc())
         raise
 
-app = FastAPI(title="Construction CRM")
+app = FastAPI(title="Construction CRM", default_response_class=ORJSONResponse)
 
 print("Available routes:", [route.path for route in app.routes])
 
@@ -117,6 +95,10 @@ origins = [
     "*"  # Allow all origins temporarily
 ]
 
+# Rate limits and concurrency caps for the public intake routes. Added before
+# CORS so CORS wraps it and browsers can read the 429/503 answers.
+app.add_middleware(rate_limits.RateLimitMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -127,6 +109,13 @@ app.add_middleware(
     max_age=3600,
 )
 
+# Statement counts and timings feed /metrics and the optional X-Query-Count header
+query_stats.install_query_hooks(engine, async_engine.sync_engine)
+metrics.install_pool_metrics(sync=engine.pool, asyncio=async_engine.sync_engine.pool)
+if query_stats.QUERY_COUNT_ENABLED:
+    app.add_middleware(query_stats.QueryCountMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
+
 class CORSStaticFiles(StaticFiles):
     async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         if scope["type"] == "http":
@@ -143,124 +132,133 @@ class CORSStaticFiles(StaticFiles):
 
 @app.on_event("startup")
 async def startup_event():
-    db = SessionLocal()
-    try:
-        initialize_db(db)
-    finally:
-        db.close()
+    initialize_db()
+
+    if website_intake.WEBSITE_FORM_MODE == "queue":
+        website_intake.get_website_form_worker().start()
+    if reminders.REMINDERS_ENABLED:
+        reminders.get_reminder_scheduler().start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if website_intake.website_form_worker is not None:
+        await website_intake.website_form_worker.stop()
+    if reminders.reminder_scheduler is not None:
+        await reminders.reminder_scheduler.stop()
 
 # Mount static files with CORS support
 app.mount("/static", CORSStaticFiles(directory="static"), name="static")
 
+# Fingerprinted, precompressed copies of the static files; /static keeps
+# serving the plain files for anything that links to them directly
+assets = static_assets.AssetStore("static")
+app.mount("/assets", assets, name="assets")
+
 # Templates
 templates = Jinja2Templates(directory="templates")
+spa_shell = static_assets.SpaShell(templates.env, "index.html", assets)
 
 @app.get("/")
 async def home(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request})
+    return spa_shell.response(request)
 
 # Customer endpoints
 @app.post("/customers/", response_model=schemas.Customer)
-def create_customer(customer: schemas.CustomerCreate, db: Session = Depends(get_db)):
+async def create_customer(customer: schemas.CustomerCreate, db: AsyncSession = Depends(get_async_db)):
     try:
         logger.info(f"Creating customer: {customer.dict()}")
         db_customer = models.Customer(**customer.dict())
         db.add(db_customer)
-        db.commit()
-        db.refresh(db_customer)
+        await dashboard_stats.adjust_counter(
+            db, dashboard_stats.CUSTOMERS, dashboard_stats.customer_status(db_customer.is_active), 1
+        )
+        await db.commit()
+        await db.refresh(db_customer)
         logger.info(f"Customer created successfully: {db_customer.id}")
         return db_customer
     except Exception as e:
         logger.error(f"Error creating customer: {str(e)}")
         logger.error(traceback.format_exc())
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/customers/", response_model=List[schemas.Customer])
-def list_customers(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
+async def list_customers(request: Request, skip: int = 0, limit: int = 10, cursor: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
+    after_id = decode_cursor(cursor) if cursor else None
     try:
-        customers = db.query(models.Customer).offset(skip).limit(limit).all()
-        return customers
+        view = lean_reads.CUSTOMERS
+        query = view.select()
+        customers = view.rows(await db.execute(paginate(query, models.Customer, skip, limit, after_id)))
+        validators = conditional.page_validators(customers, skip, limit, after_id)
+        if conditional.is_not_modified(request, validators):
+            return conditional.not_modified_response(validators)
+        response = lean_reads.lean_response(customers)
+        set_next_cursor(response, customers, limit)
+        return conditional.apply_validators(response, validators)
     except Exception as e:
         logger.error(f"Error listing customers: {str(e)}")
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/customers/{customer_id}", response_model=schemas.CustomerWithProjects)
-def get_customer(customer_id: int, db: Session = Depends(get_db)):
+async def get_customer(request: Request, customer_id: int, db: AsyncSession = Depends(get_async_db)):
     try:
-        customer = db.query(models.Customer).options(
-            joinedload(models.Customer.projects)
-        ).filter(models.Customer.id == customer_id).first()
+        view = lean_reads.CUSTOMER_DETAIL
+        result = await db.execute(view.select().filter(models.Customer.id == customer_id))
+        customer = next(iter(view.rows(result)), None)
         
         if customer is None:
             raise HTTPException(status_code=404, detail="Customer not found")
         
-        return customer
+        projects = lean_reads.PROJECTS
+        result = await db.execute(
+            projects.select().filter(models.Project.customer_id == customer_id).order_by(models.Project.id)
+        )
+        customer.projects = projects.rows(result)
+        validators = conditional.row_validators(customer, *customer.projects)
+        if conditional.is_not_modified(request, validators):
+            return conditional.not_modified_response(validators)
+        return conditional.apply_validators(lean_reads.lean_response(customer), validators)
     except Exception as e:
         logger.error(f"Error getting customer: {str(e)}")
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/customers/{customer_id}")
-def delete_customer(customer_id: int, db: Session = Depends(get_db)):
+async def delete_customer(customer_id: int, db: AsyncSession = Depends(get_async_db)):
     try:
-        # Get the customer
-        customer = db.query(models.Customer).filter(models.Customer.id == customer_id).first()
-        if not customer:
-            raise HTTPException(status_code=404, detail="Customer not found")
+        # Related projects, interactions, notifications and converted leads go
+        # with it, via subquery deletes rather than loading them first
+        deleted = await cascade_delete.delete_customers(db, [customer_id])
+        await db.commit()
+    except Exception as e:
+        logger.error(f"Error deleting customer: {str(e)}")
+        logger.error(traceback.format_exc())
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
 
-        # Get all projects for this customer
-        projects = db.query(models.Project).filter(models.Project.customer_id == customer_id).all()
-        project_ids = [project.id for project in projects]
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Customer not found")
+    return {"message": f"Customer {customer_id} and all related records deleted successfully"}
 
-        # Delete all related records in the correct order to avoid foreign key constraint errors
-        
-        # 1. Delete vendor projects first (they reference projects)
-        if project_ids:
-            db.query(models.VendorProject).filter(
-                models.VendorProject.project_id.in_(project_ids)
-            ).delete(synchronize_session=False)
-
-        # 2. Delete notifications (they reference both customers and projects)
-        db.query(models.Notification).filter(
-            (models.Notification.customer_id == customer_id) |
-            (models.Notification.project_id.in_(project_ids) if project_ids else False)
-        ).delete(synchronize_session=False)
-
-        # 3. Delete leads that reference this customer
-        db.query(models.Lead).filter(
-            models.Lead.converted_to_customer_id == customer_id
-        ).delete(synchronize_session=False)
-
-        # 4. Delete interactions
-        db.query(models.Interaction).filter(
-            models.Interaction.customer_id == customer_id
-        ).delete(synchronize_session=False)
-
-        # 5. Delete projects
-        if project_ids:
-            db.query(models.Project).filter(
-                models.Project.id.in_(project_ids)
-            ).delete(synchronize_session=False)
-
-        # 6. Finally delete the customer
-        db.query(models.Customer).filter(models.Customer.id == customer_id).delete(synchronize_session=False)
-
-        db.commit()
-        return {"message": f"Customer {customer_id} and all related records deleted successfully"}
+@app.delete("/customers")
+async def delete_customers(payload: schemas.CustomerIdList, db: AsyncSession = Depends(get_async_db)):
+    try:
+        deleted = await cascade_delete.delete_customers(db, payload.ids)
+        await db.commit()
+        return {"message": f"Deleted {deleted} customers and all related records", "deleted": deleted}
     except Exception as e:
-        logger.error(f"Error deleting customer: {str(e)}")
+        logger.error(f"Error deleting customers: {str(e)}")
         logger.error(traceback.format_exc())
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 # Project endpoints
 @app.post("/projects/", response_model=schemas.Project)
-def create_project(project: schemas.ProjectCreate, db: Session = Depends(get_db)):
+async def create_project(project: schemas.ProjectCreate, db: AsyncSession = Depends(get_async_db)):
     try:
         # Verify customer exists
-        customer = db.query(models.Customer).filter(models.Customer.id == project.customer_id).first()
+        customer = await db.get(models.Customer, project.customer_id)
         if not customer:
             raise HTTPException(status_code=404, detail="Customer not found")
         
@@ -269,59 +267,83 @@ def create_project(project: schemas.ProjectCreate, db: Session = Depends(get_db)
         
         db_project = models.Project(**project_data)
         db.add(db_project)
-        db.commit()
-        db.refresh(db_project)
-        return db_project
+        await dashboard_stats.adjust_counter(db, dashboard_stats.PROJECTS, db_project.status, 1)
+        await db.commit()
+        # Reload with the customer attached; the response nests it and
+        # lazy loading is not available on an async session
+        result = await db.execute(
+            select(models.Project).options(
+                selectinload(models.Project.customer)
+            ).filter(models.Project.id == db_project.id)
+        )
+        return result.scalars().one()
     except Exception as e:
         logger.error(f"Error creating project: {str(e)}")
         logger.error(traceback.format_exc())
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/projects/", response_model=List[schemas.Project])
-def list_projects(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
+async def list_projects(request: Request, skip: int = 0, limit: int = 10, cursor: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
+    after_id = decode_cursor(cursor) if cursor else None
     try:
-        projects = db.query(models.Project).options(
-            joinedload(models.Project.customer)
-        ).offset(skip).limit(limit).all()
-        return projects
+        # Customer columns come back in the same row through an outer join
+        view = lean_reads.PROJECTS
+        query = view.select()
+        projects = view.rows(await db.execute(paginate(query, models.Project, skip, limit, after_id)))
+        validators = conditional.page_validators(projects, skip, limit, after_id)
+        if conditional.is_not_modified(request, validators):
+            return conditional.not_modified_response(validators)
+        response = lean_reads.lean_response(projects)
+        set_next_cursor(response, projects, limit)
+        return conditional.apply_validators(response, validators)
     except Exception as e:
         logger.error(f"Error listing projects: {str(e)}")
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/projects/{project_id}", response_model=schemas.Project)
-def get_project(project_id: int, db: Session = Depends(get_db)):
+async def get_project(request: Request, project_id: int, db: AsyncSession = Depends(get_async_db)):
     try:
-        project = db.query(models.Project).options(
-            joinedload(models.Project.customer)
-        ).filter(models.Project.id == project_id).first()
+        view = lean_reads.PROJECTS
+        result = await db.execute(view.select().filter(models.Project.id == project_id))
+        project = next(iter(view.rows(result)), None)
         
         if project is None:
             raise HTTPException(status_code=404, detail="Project not found")
         
-        return project
+        validators = conditional.row_validators(project)
+        if conditional.is_not_modified(request, validators):
+            return conditional.not_modified_response(validators)
+        return conditional.apply_validators(lean_reads.lean_response(project), validators)
     except Exception as e:
         logger.error(f"Error getting project: {str(e)}")
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/projects/{project_id}")
-def delete_project(project_id: int, db: Session = Depends(get_db)):
-    db_project = db.query(models.Project).filter(models.Project.id == project_id).first()
+async def delete_project(project_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_project = await db.get(models.Project, project_id)
     if not db_project:
         raise HTTPException(status_code=404, detail="Project not found")
-    db.delete(db_project)
-    db.commit()
+    # Vendor assignments have no ORM relationship to cascade through
+    await db.execute(delete(models.VendorProject).where(models.VendorProject.project_id == project_id))
+    await db.delete(db_project)
+    await dashboard_stats.adjust_counter(db, dashboard_stats.PROJECTS, db_project.status, -1)
+    await db.commit()
     return {"message": "Project deleted successfully"}
 
 @app.get("/customers/{customer_id}/projects", response_model=List[schemas.Project])
-def get_customer_projects(customer_id: int, db: Session = Depends(get_db)):
+async def get_customer_projects(customer_id: int, db: AsyncSession = Depends(get_async_db)):
     try:
-        customer = db.query(models.Customer).filter(models.Customer.id == customer_id).first()
+        customer = await db.get(models.Customer, customer_id)
         if customer is None:
             raise HTTPException(status_code=404, detail="Customer not found")
-        return customer.projects
+        view = lean_reads.PROJECTS
+        result = await db.execute(
+            view.select().filter(models.Project.customer_id == customer_id).order_by(models.Project.id)
+        )
+        return lean_reads.lean_response(view.rows(result))
     except Exception as e:
         logger.error(f"Error getting customer projects: {str(e)}")
         logger.error(traceback.format_exc())
@@ -329,72 +351,92 @@ def get_customer_projects(customer_id: int, db: Session = Depends(get_db)):
 
 # Vendor Endpoints
 @app.post("/vendors/", response_model=schemas.Vendor)
-def create_vendor(vendor: schemas.VendorCreate, db: Session = Depends(get_db)):
+async def create_vendor(vendor: schemas.VendorCreate, db: AsyncSession = Depends(get_async_db)):
     try:
         db_vendor = models.Vendor(**vendor.dict())
         db.add(db_vendor)
-        db.commit()
-        db.refresh(db_vendor)
+        await db.commit()
+        await db.refresh(db_vendor)
         return db_vendor
     except Exception as e:
         logger.error(f"Error creating vendor: {str(e)}")
         logger.error(traceback.format_exc())
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/vendors/", response_model=List[schemas.Vendor])
-def list_vendors(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
+async def list_vendors(request: Request, skip: int = 0, limit: int = 10, cursor: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
+    after_id = decode_cursor(cursor) if cursor else None
     try:
-        vendors = db.query(models.Vendor).offset(skip).limit(limit).all()
-        return vendors
+        view = lean_reads.VENDORS
+        query = view.select()
+        vendors = view.rows(await db.execute(paginate(query, models.Vendor, skip, limit, after_id)))
+        validators = conditional.page_validators(vendors, skip, limit, after_id)
+        if conditional.is_not_modified(request, validators):
+            return conditional.not_modified_response(validators)
+        response = lean_reads.lean_response(vendors)
+        set_next_cursor(response, vendors, limit)
+        return conditional.apply_validators(response, validators)
     except Exception as e:
         logger.error(f"Error listing vendors: {str(e)}")
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/vendors/{vendor_id}", response_model=schemas.Vendor)
-def get_vendor(vendor_id: int, db: Session = Depends(get_db)):
+async def get_vendor(request: Request, vendor_id: int, db: AsyncSession = Depends(get_async_db)):
     try:
-        vendor = db.query(models.Vendor).filter(models.Vendor.id == vendor_id).first()
+        view = lean_reads.VENDORS
+        vendor = next(iter(view.rows(await db.execute(view.select().filter(models.Vendor.id == vendor_id)))), None)
         if vendor is None:
             raise HTTPException(status_code=404, detail="Vendor not found")
-        return vendor
+        validators = conditional.row_validators(vendor)
+        if conditional.is_not_modified(request, validators):
+            return conditional.not_modified_response(validators)
+        return conditional.apply_validators(lean_reads.lean_response(vendor), validators)
     except Exception as e:
         logger.error(f"Error getting vendor: {str(e)}")
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/vendors/{vendor_id}")
-def delete_vendor(vendor_id: int, db: Session = Depends(get_db)):
-    db_vendor = db.query(models.Vendor).filter(models.Vendor.id == vendor_id).first()
+async def delete_vendor(vendor_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_vendor = await db.get(models.Vendor, vendor_id)
     if not db_vendor:
         raise HTTPException(status_code=404, detail="Vendor not found")
-    db.delete(db_vendor)
-    db.commit()
+    await db.execute(delete(models.VendorProject).where(models.VendorProject.vendor_id == vendor_id))
+    await db.delete(db_vendor)
+    await db.commit()
     return {"message": "Vendor deleted successfully"}
 
 # Interaction Endpoints
 @app.post("/interactions/", response_model=schemas.Interaction)
-def create_interaction(interaction: schemas.InteractionCreate, db: Session = Depends(get_db)):
+async def create_interaction(interaction: schemas.InteractionCreate, db: AsyncSession = Depends(get_async_db)):
     try:
         db_interaction = models.Interaction(**interaction.dict())
         db.add(db_interaction)
-        db.commit()
-        db.refresh(db_interaction)
-        return db_interaction
+        await db.commit()
+        view = lean_reads.INTERACTIONS
+        result = await db.execute(view.select().filter(models.Interaction.id == db_interaction.id))
+        return lean_reads.lean_response(lean_reads.with_project_customers(view.rows(result))[0])
     except Exception as e:
         logger.error(f"Error creating interaction: {str(e)}")
         logger.error(traceback.format_exc())
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/interactions/customer/{customer_id}", response_model=List[schemas.Interaction])
-def get_customer_interactions(customer_id: int, db: Session = Depends(get_db)):
+async def get_customer_interactions(customer_id: int, skip: int = 0, limit: int = 50, cursor: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
+    after_id = decode_cursor(cursor) if cursor else None
     try:
-        interactions = db.query(models.Interaction).filter(
-            models.Interaction.customer_id == customer_id
-        ).all()
-        return interactions
+        # Every nested relation is many-to-one, so joining them in keeps the
+        # whole page to a single statement without multiplying rows
+        view = lean_reads.INTERACTIONS
+        query = view.select().filter(models.Interaction.customer_id == customer_id)
+        result = await db.execute(paginate(query, models.Interaction, skip, limit, after_id))
+        interactions = lean_reads.with_project_customers(view.rows(result))
+        response = lean_reads.lean_response(interactions)
+        set_next_cursor(response, interactions, limit)
+        return response
     except Exception as e:
         logger.error(f"Error getting customer interactions: {str(e)}")
         logger.error(traceback.format_exc())
@@ -402,27 +444,34 @@ def get_customer_interactions(customer_id: int, db: Session = Depends(get_db)):
 
 # Notification Endpoints
 @app.post("/notifications/", response_model=schemas.Notification)
-def create_notification(notification: schemas.NotificationCreate, db: Session = Depends(get_db)):
+async def create_notification(notification: schemas.NotificationCreate, db: AsyncSession = Depends(get_async_db)):
     try:
         db_notification = models.Notification(**notification.dict())
         db.add(db_notification)
-        db.commit()
-        db.refresh(db_notification)
-        return db_notification
+        await db.commit()
+        live_events.publish("notification.created", live_events.notification_event(db_notification))
+        view = lean_reads.NOTIFICATIONS
+        result = await db.execute(view.select().filter(models.Notification.id == db_notification.id))
+        return lean_reads.lean_response(lean_reads.with_project_customers(view.rows(result))[0])
     except Exception as e:
         logger.error(f"Error creating notification: {str(e)}")
         logger.error(traceback.format_exc())
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/notifications/", response_model=List[schemas.Notification])
-def list_notifications(skip: int = 0, limit: int = 10, unread_only: bool = False, db: Session = Depends(get_db)):
+async def list_notifications(skip: int = 0, limit: int = 10, unread_only: bool = False, cursor: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
+    after_id = decode_cursor(cursor) if cursor else None
     try:
-        query = db.query(models.Notification)
+        view = lean_reads.NOTIFICATIONS
+        query = view.select()
         if unread_only:
             query = query.filter(models.Notification.is_read == False)
-        notifications = query.offset(skip).limit(limit).all()
-        return notifications
+        result = await db.execute(paginate(query, models.Notification, skip, limit, after_id))
+        notifications = lean_reads.with_project_customers(view.rows(result))
+        response = lean_reads.lean_response(notifications)
+        set_next_cursor(response, notifications, limit)
+        return response
     except Exception as e:
         logger.error(f"Error listing notifications: {str(e)}")
         logger.error(traceback.format_exc())
@@ -430,65 +479,113 @@ def list_notifications(skip: int = 0, limit: int = 10, unread_only: bool = False
 
 # Lead Endpoints
 @app.post("/leads/", response_model=schemas.Lead)
-def create_lead(lead: schemas.LeadCreate, db: Session = Depends(get_db)):
+async def create_lead(lead: schemas.LeadCreate, db: AsyncSession = Depends(get_async_db)):
     try:
         # Log the incoming data
         logger.info("Incoming lead data: %s", json.dumps(lead.dict(), default=str))
         
         lead_data = lead.dict()
+        lead_data["next_follow_up"] = reminders.follow_up_time(lead_data["next_follow_up"])
         
         # Status is already an enum from the schema validation
         db_lead = models.Lead(**lead_data)
         db.add(db_lead)
-        db.commit()
-        db.refresh(db_lead)
+        await dashboard_stats.adjust_counter(db, dashboard_stats.LEADS, db_lead.status, 1)
+        await db.commit()
+        await db.refresh(db_lead)
+        live_events.publish("lead.created", live_events.lead_event(db_lead))
         logger.info("Lead created successfully with ID: %s", db_lead.id)
         return db_lead
     except Exception as e:
         logger.error("Error creating lead: %s", str(e))
         logger.error("Full traceback: %s", traceback.format_exc())
-        db.rollback()
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/leads/bulk")
+async def bulk_create_leads(
+    request: Request,
+    batch_size: int = lead_import.DEFAULT_BATCH_SIZE,
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Accepts a JSON array, or a CSV / NDJSON body that is parsed as it streams in
+    if batch_size < 1 or batch_size > lead_import.MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"batch_size must be between 1 and {lead_import.MAX_BATCH_SIZE}")
+
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in lead_import.CSV_TYPES:
+        records = lead_import.iter_csv_records(request.stream())
+    elif content_type in lead_import.NDJSON_TYPES:
+        records = lead_import.iter_ndjson_records(request.stream())
+    else:
+        try:
+            payload = await request.json()
+        except ValueError:
+            payload = None
+        if not isinstance(payload, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array of leads")
+        records = lead_import.iter_json_records(payload)
+
+    try:
+        return await lead_import.import_leads(db, records, batch_size)
+    except Exception as e:
+        logger.error(f"Error importing leads: {str(e)}")
+        logger.error(traceback.format_exc())
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/leads/", response_model=List[schemas.Lead])
-def list_leads(status: str = None, skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
+async def list_leads(request: Request, status: str = None, skip: int = 0, limit: int = 10, cursor: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
+    after_id = decode_cursor(cursor) if cursor else None
     try:
-        query = db.query(models.Lead)
+        view = lean_reads.LEADS
+        query = view.select()
         if status:
             query = query.filter(models.Lead.status == status)
-        leads = query.offset(skip).limit(limit).all()
-        return leads
+        leads = view.rows(await db.execute(paginate(query, models.Lead, skip, limit, after_id)))
+        validators = conditional.page_validators(leads, status, skip, limit, after_id)
+        if conditional.is_not_modified(request, validators):
+            return conditional.not_modified_response(validators)
+        response = lean_reads.lean_response(leads)
+        set_next_cursor(response, leads, limit)
+        return conditional.apply_validators(response, validators)
     except Exception as e:
         logger.error(f"Error listing leads: {str(e)}")
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/leads/{lead_id}", response_model=schemas.Lead)
-def get_lead(lead_id: int, db: Session = Depends(get_db)):
+async def get_lead(request: Request, lead_id: int, db: AsyncSession = Depends(get_async_db)):
     try:
-        db_lead = db.query(models.Lead).filter(models.Lead.id == lead_id).first()
-        if db_lead is None:
+        view = lean_reads.LEADS
+        lead = next(iter(view.rows(await db.execute(view.select().filter(models.Lead.id == lead_id)))), None)
+        if lead is None:
             raise HTTPException(status_code=404, detail="Lead not found")
-        return db_lead
+        validators = conditional.row_validators(lead)
+        if conditional.is_not_modified(request, validators):
+            return conditional.not_modified_response(validators)
+        return conditional.apply_validators(lean_reads.lean_response(lead), validators)
     except Exception as e:
         logger.error(f"Error getting lead: {str(e)}")
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/leads/{lead_id}")
-async def delete_lead(lead_id: int, db: Session = Depends(get_db)):
-    lead = db.query(models.Lead).filter(models.Lead.id == lead_id).first()
+async def delete_lead(lead_id: int, db: AsyncSession = Depends(get_async_db)):
+    lead = await db.get(models.Lead, lead_id)
     if not lead:
         raise HTTPException(status_code=404, detail="Lead not found")
     
     try:
-        db.delete(lead)
-        db.commit()
+        await db.delete(lead)
+        await dashboard_stats.adjust_counter(db, dashboard_stats.LEADS, lead.status, -1)
+        await db.commit()
+        website_intake.lead_email_cache.forget(website_intake.normalize_email(lead.email))
         return {"message": "Lead deleted successfully"}
     except Exception as e:
         logger.error(f"Error deleting lead: {str(e)}")
         logger.error(traceback.format_exc())
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 class LeadUpdate(BaseModel):
@@ -497,32 +594,46 @@ class LeadUpdate(BaseModel):
     next_follow_up: Optional[datetime] = None
 
 @app.put("/leads/{lead_id}/status")
-def update_lead_status(lead_id: int, lead_update: LeadUpdate, db: Session = Depends(get_db)):
+async def update_lead_status(lead_id: int, lead_update: LeadUpdate, db: AsyncSession = Depends(get_async_db)):
+    # Checked before anything is written: an unknown status would become a
+    # counter row of its own and a lead the enum column cannot read back
     try:
-        lead = db.query(models.Lead).filter(models.Lead.id == lead_id).first()
-        if not lead:
-            raise HTTPException(status_code=404, detail="Lead not found")
+        status = models.LeadStatus(lead_update.status)
+    except ValueError:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Invalid lead status: {lead_update.status}. Expected one of: {', '.join(s.value for s in models.LeadStatus)}"
+        )
+
+    lead = await db.get(models.Lead, lead_id)
+    if not lead:
+        raise HTTPException(status_code=404, detail="Lead not found")
 
+    try:
         # Update lead status and fields
-        lead.status = lead_update.status
+        await dashboard_stats.move_counter(db, dashboard_stats.LEADS, lead.status, status)
+        lead.status = status
         if lead_update.notes:
             lead.notes = lead_update.notes
         if lead_update.next_follow_up:
-            lead.next_follow_up = lead_update.next_follow_up
+            lead.next_follow_up = reminders.follow_up_time(lead_update.next_follow_up)
         lead.last_contact = datetime.utcnow()
 
-        db.commit()
+        await db.commit()
+        if status not in reminders.OPEN_LEAD_STATUSES:
+            website_intake.lead_email_cache.forget(website_intake.normalize_email(lead.email))
+        live_events.publish("lead.status", {"id": lead.id, "status": lead.status})
         return {"message": "Lead status updated successfully"}
     except Exception as e:
         logger.error(f"Error updating lead status: {str(e)}")
         logger.error(traceback.format_exc())
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/leads/{lead_id}/convert", response_model=schemas.Customer)
-async def convert_lead_to_customer(lead_id: int, db: Session = Depends(get_db)):
+async def convert_lead_to_customer(lead_id: int, db: AsyncSession = Depends(get_async_db)):
     # Get the lead
-    lead = db.query(models.Lead).filter(models.Lead.id == lead_id).first()
+    lead = await db.get(models.Lead, lead_id)
     if not lead:
         raise HTTPException(status_code=404, detail="Lead not found")
 
@@ -537,147 +648,255 @@ async def convert_lead_to_customer(lead_id: int, db: Session = Depends(get_db)):
     db.add(customer)
     
     # Update lead status and conversion details
+    await dashboard_stats.move_counter(db, dashboard_stats.LEADS, lead.status, models.LeadStatus.CONVERTED)
+    await dashboard_stats.adjust_counter(db, dashboard_stats.CUSTOMERS, dashboard_stats.CUSTOMER_ACTIVE, 1)
     lead.status = models.LeadStatus.CONVERTED
     lead.converted_at = datetime.utcnow()
     lead.converted_to_customer_id = customer.id
     
     try:
-        db.commit()
-        db.refresh(customer)
+        await db.commit()
+        website_intake.lead_email_cache.forget(website_intake.normalize_email(lead.email))
+        await db.refresh(customer)
         return customer
     except Exception as e:
         logger.error(f"Error converting lead to customer: {str(e)}")
         logger.error(traceback.format_exc())
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 # Website Form Integration
-class WebsiteFormData(BaseModel):
-    name: str
-    email: str
-    phone: Optional[str] = None
-    message: Optional[str] = None
-    project_type: Optional[str] = None
-    address: Optional[str] = None
-    source: Optional[str] = 'Website Contact Form'
-
 @app.post("/api/website-form")
 async def handle_website_form(
-    form_data: WebsiteFormData,
-    db: Session = Depends(get_db)
+    form_data: schemas.WebsiteFormData,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
 ):
+    # Double clicks and browser retries are answered from the idempotency
+    # cache before any database work; the session connects lazily, so a
+    # replay never checks out a connection
+    key = idempotency.request_key(idempotency_key, form_data)
+    replay = await idempotency.store.claim(key)
+    if replay is not None:
+        response.status_code, body = replay
+        response.headers[idempotency.REPLAYED_HEADER] = "true"
+        return body
+
+    answer = None
     try:
-        # Create a new lead
-        lead = models.Lead(
-            name=form_data.name,
-            email=form_data.email,
-            phone=form_data.phone,
-            address=form_data.address,
-            description=form_data.message,
-            project_type=form_data.project_type,
-            source=form_data.source or 'Website Contact Form',
-            status=models.LeadStatus.NEW,
-            created_at=datetime.utcnow()
-        )
-        
-        # Save lead to database
-        db.add(lead)
-        db.commit()
-        db.refresh(lead)
-        
-        # Create a notification for the new lead
-        notification = models.Notification(
-            type=models.NotificationType.LEAD,
-            title=f"New Lead from {form_data.source}: {form_data.name}",
-            description=f"New contact form submission from {form_data.name} ({form_data.email})",
-            due_date=datetime.utcnow() + timedelta(days=1)
-        )
-        db.add(notification)
-        db.commit()
-
-        return {
-            "status": "success", 
-            "message": "Form submitted successfully", 
-            "lead_id": lead.id
-        }
-    
+        if website_intake.WEBSITE_FORM_MODE == "queue":
+            # Write-behind: persist to the local outbox and answer right away,
+            # the worker writes the lead and its notification in batches
+            try:
+                worker = website_intake.get_website_form_worker()
+                queue_id = await run_in_threadpool(worker.queue.append, form_data, key)
+                worker.notify()
+            except Exception as e:
+                logger.error(f"Error queueing website form: {str(e)}")
+                logger.error(traceback.format_exc())
+                raise HTTPException(status_code=500, detail="Error processing form submission")
+
+            answer = (202, {
+                "status": "accepted",
+                "message": "Form submitted successfully",
+                "queue_id": queue_id
+            })
+        else:
+            try:
+                # Lead (or the update of the open lead with this email),
+                # notification and idempotency key in a single transaction
+                lead_ids = await website_intake.write_submissions(db, [form_data], [key])
+            except Exception as e:
+                logger.error(f"Error processing website form: {str(e)}")
+                logger.error(traceback.format_exc())
+                await db.rollback()
+                raise HTTPException(status_code=500, detail="Error processing form submission")
+
+            answer = (200, {
+                "status": "success", 
+                "message": "Form submitted successfully", 
+                "lead_id": lead_ids[0]
+            })
+    finally:
+        idempotency.store.release(key, answer)
+
+    response.status_code, body = answer
+    return body
+
+@app.get("/api/website-form/queue")
+async def website_form_queue_stats():
+    try:
+        worker = website_intake.get_website_form_worker()
+        if worker is None:
+            return {"mode": website_intake.WEBSITE_FORM_MODE, "running": False}
+        return await run_in_threadpool(worker.stats)
+    except Exception as e:
+        logger.error(f"Error reading website form queue stats: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/website-form/dedup")
+async def website_form_dedup_stats():
+    return {
+        "idempotency": idempotency.store.stats(),
+        "lead_email_cache": website_intake.lead_email_cache.cache.stats()
+    }
+
+# Live updates
+@app.get("/events")
+async def event_stream(last_event_id: Optional[str] = Header(None)):
+    # Server-Sent Events: one idle connection per open tab instead of polled
+    # list queries. Holds no database session; EventSource resumes with the
+    # Last-Event-ID header after a reconnect.
+    subscriber = live_events.hub.subscribe(last_event_id)
+    return StreamingResponse(
+        live_events.stream(subscriber),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/reminders/stats")
+async def reminder_stats():
+    return reminders.get_reminder_scheduler().stats()
+
+@app.get("/events/stats")
+async def event_stream_stats():
+    return live_events.hub.stats()
+
+@app.get("/api/rate-limits")
+async def rate_limit_stats():
+    return rate_limits.stats()
+
+# Search endpoints
+@app.get("/search")
+async def search(
+    q: str,
+    skip: int = 0,
+    limit: int = Query(20, le=search_index.MAX_SEARCH_RESULTS),
+    db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        return await search_index.search(db, q, skip=skip, limit=limit)
     except Exception as e:
-        logger.error(f"Error processing website form: {str(e)}")
+        logger.error(f"Error in search: {str(e)}")
         logger.error(traceback.format_exc())
-        db.rollback()
-        raise HTTPException(status_code=500, detail="Error processing form submission")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Export endpoints
+@app.get("/export/{entity}")
+async def export_entity(
+    entity: str,
+    export_format: str = Query("csv", alias="format"),
+    updated_since: Optional[datetime] = None,
+    gzip: bool = False
+):
+    if entity not in exports.EXPORT_MODELS:
+        raise HTTPException(status_code=404, detail=f"Unknown export entity: {entity}")
+    if export_format not in exports.FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format: {export_format}")
+
+    filename = f"{entity}.{export_format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        exports.stream_export(entity, export_format, updated_since, gzip),
+        media_type="application/gzip" if gzip else exports.FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 # Admin endpoints
 @app.post("/admin/clear-db")
-def clear_database(db: Session = Depends(get_db)):
-    try:
-        # Clear all tables in the correct order to avoid foreign key constraints
-        db.query(models.Interaction).delete()
-        db.query(models.Notification).delete()
-        db.query(models.VendorProject).delete()
-        db.query(models.Vendor).delete()
-        db.query(models.Lead).delete()
-        db.query(models.Project).delete()
-        db.query(models.Customer).delete()
-        
-        db.commit()
+async def clear_database(vacuum: bool = False):
+    try:
+        # TRUNCATE on PostgreSQL, drop and recreate on SQLite
+        await run_in_threadpool(db_reset.reset_database, engine, vacuum)
+        website_intake.lead_email_cache.clear()
+        idempotency.store.clear()
         return {"message": "Database cleared successfully"}
     except Exception as e:
         logger.error(f"Error clearing database: {str(e)}")
         logger.error(traceback.format_exc())
-        db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/admin/purge/{entity}")
+async def purge_old_records(
+    entity: str,
+    older_than_days: int = Query(..., ge=0),
+    chunk_size: int = Query(db_reset.DEFAULT_PURGE_CHUNK_SIZE, ge=1, le=50000)
+):
+    if entity not in db_reset.PURGEABLE:
+        raise HTTPException(status_code=404, detail=f"Unknown purge entity: {entity}")
+    try:
+        purged = await run_in_threadpool(db_reset.purge_older_than, entity, older_than_days, engine, chunk_size)
+        if entity == "leads":
+            website_intake.lead_email_cache.clear()
+        return {"message": f"Purged {purged} {entity} older than {older_than_days} days", "purged": purged}
+    except Exception as e:
+        logger.error(f"Error purging {entity}: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/bootstrap")
+async def get_bootstrap(limit: int = 25, db: AsyncSession = Depends(get_async_db)):
+    try:
+        # The whole initial view in one response, instead of a request per
+        # list plus one per customer for the project pickers
+        return lean_reads.lean_response(await bootstrap.initial_view(db, limit))
+    except Exception as e:
+        logger.error(f"Error building bootstrap data: {str(e)}")
+        logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/dashboard/stats")
-def get_dashboard_stats(db: Session = Depends(get_db)):
+async def get_dashboard_stats(db: AsyncSession = Depends(get_async_db)):
     try:
-        logger.info("Starting to fetch dashboard stats")
-        
-        # Get lead statistics
-        logger.info("Fetching lead statistics")
-        total_leads = db.query(models.Lead).count()
-        logger.info(f"Total leads: {total_leads}")
-        converted_leads = db.query(models.Lead).filter(models.Lead.status == models.LeadStatus.CONVERTED).count()
-        logger.info(f"Converted leads: {converted_leads}")
-
-        # Get customer statistics
-        logger.info("Fetching customer statistics")
-        total_customers = db.query(models.Customer).count()
-        logger.info(f"Total customers: {total_customers}")
-        active_customers = db.query(models.Customer).filter(models.Customer.is_active == True).count()
-        logger.info(f"Active customers: {active_customers}")
-
-        # Get project statistics
-        logger.info("Fetching project statistics")
-        total_projects = db.query(models.Project).count()
-        logger.info(f"Total projects: {total_projects}")
-        active_projects = db.query(models.Project).filter(
-            models.Project.status == models.ProjectStatus.IN_PROGRESS  
-        ).count()
-        logger.info(f"Active projects: {active_projects}")
-
-        stats = {
-            "leads": {
-                "total": total_leads,
-                "converted": converted_leads
-            },
-            "customers": {
-                "total": total_customers,
-                "active": active_customers
-            },
-            "projects": {
-                "total": total_projects,
-                "active": active_projects
-            }
-        }
-        logger.info(f"Returning stats: {stats}")
-        return stats
-        
+        # Served from the counters table maintained alongside every write:
+        # one small read instead of a COUNT(*) per figure
+        return await dashboard_stats.read_dashboard_stats(db)
     except Exception as e:
         logger.error(f"Error in get_dashboard_stats: {str(e)}")
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/admin/rebuild-stats")
+async def rebuild_dashboard_stats(db: AsyncSession = Depends(get_async_db)):
+    try:
+        counts = await db.run_sync(dashboard_stats.rebuild_counters)
+        return {"message": "Dashboard counters rebuilt", "counts": counts}
+    except Exception as e:
+        logger.error(f"Error rebuilding dashboard stats: {str(e)}")
+        logger.error(traceback.format_exc())
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/admin/rebuild-search-index")
+async def rebuild_search(db: AsyncSession = Depends(get_async_db)):
+    try:
+        connection = await db.connection()
+        await connection.run_sync(search_index.rebuild_search_index)
+        await db.commit()
+        return {"message": "Search index rebuilt"}
+    except Exception as e:
+        logger.error(f"Error rebuilding search index: {str(e)}")
+        logger.error(traceback.format_exc())
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/admin/slow-queries")
+async def list_slow_queries():
+    return {
+        "threshold_ms": slow_queries.SLOW_QUERY_THRESHOLD_MS,
+        "queries": slow_queries.recent_slow_queries()
+    }
+
+@app.delete("/admin/slow-queries")
+async def clear_slow_queries():
+    slow_queries.clear_slow_queries()
+    return {"message": "Slow query log cleared"}
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return metrics.metrics_response()
+
 @app.get("/debug")
 async def debug_info():
     import socket
@@ -689,11 +908,14 @@ async def debug_info():
     }
 
 if __name__ == "__main__":
+    # WEB_CONCURRENCY is the worker-count convention shared with the Procfile
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=3000,
-        reload=True,
+        workers=workers,
+        reload=workers == 1,  # uvicorn cannot reload a multi-process server
         access_log=True,
         log_level="debug",
         proxy_headers=True,
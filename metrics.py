@@ -0,0 +1,182 @@
+import contextvars
+import logging
+import os
+import time
+from typing import Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, REGISTRY, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+REQUEST_SECONDS = Histogram(
+    "crm_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"]
+)
+REQUEST_DB_QUERIES = Histogram(
+    "crm_http_request_db_queries",
+    "Database statements issued per HTTP request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 25, 50, 100, 250)
+)
+REQUEST_DB_SECONDS = Histogram(
+    "crm_http_request_db_seconds",
+    "Time spent in the database per HTTP request",
+    ["route"]
+)
+DB_QUERY_SECONDS = Histogram(
+    "crm_db_query_duration_seconds",
+    "Duration of individual database statements"
+)
+DB_QUERY_ERRORS = Counter(
+    "crm_db_query_errors",
+    "Database statements that raised"
+)
+REQUESTS_REFUSED = Counter(
+    "crm_http_requests_refused",
+    "Requests turned away by rate limits (429) or concurrency caps (503)",
+    ["route", "reason"]
+)
+POOL_CHECKOUT_SECONDS = Histogram(
+    "crm_db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection",
+    ["engine"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+)
+
+
+class RequestQueryStats:
+    __slots__ = ("queries", "seconds", "scope")
+
+    def __init__(self, scope: Optional[Scope] = None):
+        self.queries = 0
+        self.seconds = 0.0
+        self.scope = scope
+
+
+# A mutable object rather than plain numbers so statements run in child tasks
+# and threads (which get a copy of the context) land in the request's totals
+request_query_stats: contextvars.ContextVar[Optional[RequestQueryStats]] = contextvars.ContextVar(
+    "request_query_stats", default=None
+)
+
+
+def start_request_stats(scope: Scope):
+    # Reuses the stats of an enclosing middleware so both see the same totals
+    stats = request_query_stats.get()
+    if stats is not None:
+        return stats, None
+    stats = RequestQueryStats(scope)
+    return stats, request_query_stats.set(stats)
+
+
+# Matched endpoint -> path template, filled on first use
+route_templates = {}
+
+
+def route_template(scope: Scope) -> str:
+    # The router leaves the matched endpoint in the scope; mapping it back
+    # to its path template is a dict lookup instead of re-matching routes
+    if not route_templates:
+        for route in scope["app"].router.routes:
+            endpoint = getattr(route, "endpoint", None) or getattr(route, "app", None)
+            suffix = "/{path}" if not hasattr(route, "endpoint") else ""
+            route_templates[endpoint] = route.path + suffix
+    return route_templates.get(scope.get("endpoint"), "unmatched")
+
+
+def current_route() -> str:
+    # Statements outside a request come from startup or background workers
+    stats = request_query_stats.get()
+    if stats is None or stats.scope is None:
+        return "background"
+    return route_template(stats.scope)
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        stats, token = start_request_stats(scope)
+        status = 500
+
+        async def send_with_status(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = route_template(scope)
+            REQUEST_SECONDS.labels(scope["method"], route, status).observe(time.perf_counter() - started)
+            REQUEST_DB_QUERIES.labels(route).observe(stats.queries)
+            REQUEST_DB_SECONDS.labels(route).observe(stats.seconds)
+            if token is not None:
+                request_query_stats.reset(token)
+
+
+def time_pool_checkouts(name: str, pool):
+    # QueuePool blocks inside _do_get while every connection is busy; there is
+    # no pool event for the wait itself, so the bound method is wrapped
+    do_get = pool._do_get
+    histogram = POOL_CHECKOUT_SECONDS.labels(name)
+
+    def timed_do_get():
+        started = time.perf_counter()
+        try:
+            return do_get()
+        finally:
+            histogram.observe(time.perf_counter() - started)
+
+    pool._do_get = timed_do_get
+
+
+class PoolCollector:
+    # Read at scrape time, so gauges cost nothing between scrapes
+    def __init__(self, pools: dict):
+        self.pools = pools
+
+    def collect(self):
+        size = GaugeMetricFamily("crm_db_pool_size", "Configured pool size", labels=["engine"])
+        checked_out = GaugeMetricFamily("crm_db_pool_checked_out", "Connections in use", labels=["engine"])
+        idle = GaugeMetricFamily("crm_db_pool_idle", "Idle connections held by the pool", labels=["engine"])
+        overflow = GaugeMetricFamily("crm_db_pool_overflow", "Connections open beyond the pool size", labels=["engine"])
+        for name, pool in self.pools.items():
+            # SQLite's default pools do not track sizes
+            if not hasattr(pool, "checkedout"):
+                continue
+            size.add_metric([name], pool.size())
+            checked_out.add_metric([name], pool.checkedout())
+            idle.add_metric([name], pool.checkedin())
+            overflow.add_metric([name], max(pool.overflow(), 0))
+        yield from (size, checked_out, idle, overflow)
+
+
+def install_pool_metrics(**pools):
+    for name, pool in pools.items():
+        if hasattr(pool, "_do_get"):
+            time_pool_checkouts(name, pool)
+    REGISTRY.register(PoolCollector(pools))
+
+
+def metrics_response() -> Response:
+    # With several worker processes, PROMETHEUS_MULTIPROC_DIR makes every
+    # worker write its samples to shared files that any worker can report
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,331 @@
+import contextlib
+import datetime
+import logging
+import os
+import sys
+
+from sqlalchemy import Column, DateTime, Enum, Integer, MetaData, String, Table, inspect, insert, literal, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateTable
+
+import dashboard_stats
+import models
+import search_index  # registers the search index DDL on the models' metadata
+from database import engine
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary application-wide key for pg_advisory_lock
+STARTUP_LOCK_KEY = 0x43524D01
+
+# Kept off models.Base.metadata so create_all/drop_all never touch it
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+# Migration steps. Each runs in its own transaction together with the row
+# recording it, and is never edited once released: schema changes get a new
+# step appended to MIGRATIONS.
+#
+# The baseline builds the tables from the current models, so on a fresh
+# database later steps find their objects already there and must be written
+# to tolerate that (checkfirst=True, IF NOT EXISTS, inspector checks).
+#
+# The one exception is the legacy adoption added to the baseline after its
+# release. It could not be a later step: it has to run before create_all
+# and before step 3 indexes columns the legacy tables lack. Editing the
+# baseline is safe because the baseline only runs on databases without a
+# schema_migrations row, and a database the earlier baseline built has one
+# and never runs it again. Where it does run, adoption changes nothing
+# unless legacy tables exist, so fresh databases end up exactly as before.
+def baseline_schema(connection: Connection):
+    # Databases created by the old drop-and-recreate startup have tables in
+    # the shape of the first release, which create_all would skip; they are
+    # brought up to the current models first
+    adopt_legacy_tables(connection)
+    models.Base.metadata.create_all(bind=connection)
+    dashboard_stats.rebuild_counters(Session(bind=connection))
+
+
+# Columns renamed since the first release, old name -> new name
+LEGACY_RENAMES = {
+    "notifications": {"message": "description", "notification_type": "type", "read": "is_read"},
+}
+# What a free-text notification_type that is not a NotificationType value becomes
+LEGACY_NOTIFICATION_TYPE = models.NotificationType.FOLLOW_UP
+
+
+def outdated_tables(connection: Connection) -> list:
+    # Existing tables missing a model column, with a column the models no
+    # longer have, or NOT NULL where the models now allow nulls
+    inspector = inspect(connection)
+    outdated = []
+    for table in models.Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"]: column for column in inspector.get_columns(table.name)}
+        if set(existing) != set(table.columns.keys()) or any(
+            column.nullable and not existing[column.name]["nullable"]
+            for column in table.columns if column.name in existing
+        ):
+            outdated.append((table, existing))
+    return outdated
+
+
+def default_sql(connection: Connection, column) -> str:
+    # Scalar model defaults (is_active=True, revenue=0.0) as a SQL literal
+    if column.default is None or not column.default.is_scalar:
+        return "NULL"
+    return str(literal(column.default.arg, column.type).compile(
+        dialect=connection.dialect, compile_kwargs={"literal_binds": True}
+    ))
+
+
+def notification_type_sql(source: str) -> str:
+    values = ", ".join(f"'{notification_type.value}'" for notification_type in models.NotificationType)
+    return f"CASE WHEN lower({source}) IN ({values}) THEN lower({source}) ELSE '{LEGACY_NOTIFICATION_TYPE.value}' END"
+
+
+def check_legacy_table(connection: Connection, table, existing: dict):
+    # Refuse rather than guess: a column nobody maps would be lost, and a
+    # new NOT NULL column without a default has no value for old rows
+    renames = LEGACY_RENAMES.get(table.name, {})
+    unknown = set(existing) - set(table.columns.keys()) - set(renames)
+    if unknown:
+        raise RuntimeError(
+            f"Table {table.name} has columns the models do not know ({', '.join(sorted(unknown))}); "
+            "migrate or drop them by hand before starting the app"
+        )
+    renamed = {new for old, new in renames.items() if old in existing}
+    for column in table.columns:
+        if column.name not in existing and column.name not in renamed \
+                and not column.nullable and default_sql(connection, column) == "NULL":
+            raise RuntimeError(
+                f"Table {table.name} lacks the required column {column.name}, which has no default; "
+                "add it by hand before starting the app"
+            )
+
+
+def rebuild_sqlite_table(connection: Connection, table, existing: dict):
+    # SQLite can neither drop NOT NULL nor rename into a different type: the
+    # table is built anew beside the old one, filled from it, and swapped in.
+    # Nothing enables SQLite foreign keys here, so dropping the old table
+    # leaves the rows referencing it alone.
+    quote = connection.dialect.identifier_preparer.quote
+    renamed_from = {new: old for old, new in LEGACY_RENAMES.get(table.name, {}).items() if old in existing}
+    temporary = f"{table.name}__migrating"
+    create = str(CreateTable(table).compile(dialect=connection.dialect))
+    connection.exec_driver_sql(create.replace(f"CREATE TABLE {table.name} ", f"CREATE TABLE {temporary} ", 1))
+
+    sources = []
+    for column in table.columns:
+        if column.name in renamed_from:
+            source = quote(renamed_from[column.name])
+        elif column.name in existing:
+            source = quote(column.name)
+        else:
+            source = default_sql(connection, column)
+        if table.name == "notifications" and column.name == "type":
+            source = notification_type_sql(source)
+        elif not column.nullable and default_sql(connection, column) != "NULL":
+            source = f"COALESCE({source}, {default_sql(connection, column)})"
+        sources.append(source)
+    columns = ", ".join(quote(column.name) for column in table.columns)
+    connection.exec_driver_sql(
+        f"INSERT INTO {temporary} ({columns}) SELECT {', '.join(sources)} FROM {quote(table.name)}"
+    )
+    connection.exec_driver_sql(f"DROP TABLE {quote(table.name)}")
+    connection.exec_driver_sql(f"ALTER TABLE {temporary} RENAME TO {quote(table.name)}")
+    for index in table.indexes:
+        index.create(bind=connection, checkfirst=True)
+
+
+def alter_postgres_table(connection: Connection, table, existing: dict):
+    quote = connection.dialect.identifier_preparer.quote
+    name = quote(table.name)
+    for old, new in LEGACY_RENAMES.get(table.name, {}).items():
+        if old in existing and new not in existing:
+            connection.exec_driver_sql(f"ALTER TABLE {name} RENAME COLUMN {quote(old)} TO {quote(new)}")
+            existing[new] = existing.pop(old)
+
+    for column in table.columns:
+        if isinstance(column.type, Enum):
+            column.type.create(bind=connection, checkfirst=True)
+        if column.name not in existing:
+            default = default_sql(connection, column)
+            definition = column.type.compile(dialect=connection.dialect)
+            if default != "NULL":
+                definition += f" DEFAULT {default}"
+            if not column.nullable:
+                definition += " NOT NULL"
+            connection.exec_driver_sql(f"ALTER TABLE {name} ADD COLUMN {quote(column.name)} {definition}")
+        elif column.nullable and not existing[column.name]["nullable"]:
+            connection.exec_driver_sql(f"ALTER TABLE {name} ALTER COLUMN {quote(column.name)} DROP NOT NULL")
+
+    if table.name == "notifications" and not isinstance(existing.get("type", {}).get("type"), Enum):
+        # The first release stored the type as free text
+        connection.exec_driver_sql(
+            f"ALTER TABLE {name} ALTER COLUMN type TYPE {quote(table.c.type.type.name)} "
+            f"USING ({notification_type_sql('type')})::{quote(table.c.type.type.name)}"
+        )
+
+
+def adopt_legacy_tables(connection: Connection):
+    outdated = outdated_tables(connection)
+    for table, existing in outdated:
+        check_legacy_table(connection, table, existing)
+    for table, existing in outdated:
+        logger.info(f"Migrating table {table.name} from an older schema")
+        if connection.dialect.name == "sqlite":
+            rebuild_sqlite_table(connection, table, existing)
+        else:
+            alter_postgres_table(connection, table, existing)
+
+
+def create_vendor_projects(connection: Connection):
+    models.VendorProject.__table__.create(bind=connection, checkfirst=True)
+
+
+# Indexes for the filters and orderings the list endpoints use; see index_audit.py
+QUERY_PATTERN_INDEXES = [
+    "ix_projects_customer_id_id",
+    "ix_interactions_customer_id_id",
+    "ix_interactions_project_id",
+    "ix_notifications_is_read_id",
+    "ix_notifications_is_read_due_date",
+    "ix_notifications_customer_id",
+    "ix_notifications_project_id",
+    "ix_leads_status_id",
+    "ix_leads_converted_to_customer_id",
+]
+
+
+def create_query_pattern_indexes(connection: Connection):
+    indexes = {index.name: index for table in models.Base.metadata.sorted_tables for index in table.indexes}
+    for name in QUERY_PATTERN_INDEXES:
+        indexes[name].create(bind=connection, checkfirst=True)
+
+
+def create_reminder_scheduling(connection: Connection):
+    models.SchedulerCursor.__table__.create(bind=connection, checkfirst=True)
+    indexes = {index.name: index for index in models.Lead.__table__.indexes}
+    indexes["ix_leads_next_follow_up"].create(bind=connection, checkfirst=True)
+
+
+def create_idempotency_keys(connection: Connection):
+    models.IdempotencyKey.__table__.create(bind=connection, checkfirst=True)
+
+
+MIGRATIONS = [
+    (1, "baseline_schema", baseline_schema),
+    (2, "create_vendor_projects", create_vendor_projects),
+    (3, "create_query_pattern_indexes", create_query_pattern_indexes),
+    (4, "create_reminder_scheduling", create_reminder_scheduling),
+    (5, "create_idempotency_keys", create_idempotency_keys),
+]
+
+
+def applied_versions(connection: Connection) -> set:
+    return set(connection.execute(select(schema_migrations.c.version)).scalars())
+
+
+def pending_migrations(connection: Connection) -> list:
+    applied = applied_versions(connection)
+    return [migration for migration in MIGRATIONS if migration[0] not in applied]
+
+
+def run_migrations(bind: Engine = engine) -> list:
+    with bind.begin() as connection:
+        schema_migrations.create(bind=connection, checkfirst=True)
+        pending = pending_migrations(connection)
+
+    if not pending:
+        logger.info(f"Database schema is up to date (version {MIGRATIONS[-1][0]})")
+        return []
+
+    for version, name, step in pending:
+        logger.info(f"Applying migration {version}: {name}")
+        with bind.begin() as connection:
+            step(connection)
+            connection.execute(
+                insert(schema_migrations).values(
+                    version=version, name=name, applied_at=datetime.datetime.utcnow()
+                )
+            )
+    logger.info(f"Applied {len(pending)} migration(s), schema is at version {pending[-1][0]}")
+    return [version for version, _, _ in pending]
+
+
+def lock_file_path(bind: Engine, name: str) -> str:
+    # Next to the SQLite file, so every worker serving that database agrees on it
+    database = bind.url.database if bind.dialect.name == "sqlite" else None
+    if database and database != ":memory:":
+        return f"{database}.{name}.lock"
+    return os.path.join(os.getcwd(), f".{name}.lock")
+
+
+def startup_lock_path(bind: Engine) -> str:
+    return os.getenv("STARTUP_LOCK_PATH") or lock_file_path(bind, "startup")
+
+
+@contextlib.contextmanager
+def startup_lock(bind: Engine = engine):
+    # Serialises schema and seed work across worker processes: the first one
+    # in does the work, the rest block here and then find nothing pending
+    if bind.dialect.name == "postgresql":
+        with bind.connect() as connection:
+            logger.info("Waiting for startup advisory lock")
+            connection.exec_driver_sql(f"SELECT pg_advisory_lock({STARTUP_LOCK_KEY})")
+            try:
+                yield
+            finally:
+                connection.exec_driver_sql(f"SELECT pg_advisory_unlock({STARTUP_LOCK_KEY})")
+        return
+
+    if fcntl is None:
+        logger.warning("File locks are unavailable on this platform, running startup unlocked")
+        yield
+        return
+
+    with open(startup_lock_path(bind), "a") as lock_file:
+        logger.info(f"Waiting for startup lock {lock_file.name}")
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def print_status(bind: Engine = engine):
+    with bind.begin() as connection:
+        schema_migrations.create(bind=connection, checkfirst=True)
+        applied = applied_versions(connection)
+    for version, name, _ in MIGRATIONS:
+        print(f"{version:>4}  {'applied' if version in applied else 'pending':<8} {name}")
+
+
+if __name__ == "__main__":
+    # python migrations.py           apply pending migrations
+    # python migrations.py status    list migrations and whether they are applied
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        if sys.argv[1:] == ["status"]:
+            print_status()
+        else:
+            with startup_lock():
+                applied = run_migrations()
+            print(f"Applied migrations: {applied}" if applied else "Nothing to migrate.")
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        sys.exit(1)
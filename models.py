@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Float, Date, Text, Enum
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Float, Date, Text, Enum, Index
 from sqlalchemy.orm import relationship
 from database import Base
 import datetime
@@ -20,6 +20,13 @@ class LeadStatus(enum.Enum):
     LOST = "LOST"
     CONVERTED = "CONVERTED"
 
+class NotificationType(enum.Enum):
+    FOLLOW_UP = "follow_up"
+    PROJECT_MILESTONE = "project_milestone"
+    TASK_REMINDER = "task_reminder"
+    LEAD = "lead"
+    COMPLETION = "completion"
+
 class LeadSource(enum.Enum):
     WEBSITE = "WEBSITE"
     REFERRAL = "REFERRAL"
@@ -35,6 +42,7 @@ class Customer(Base):
     email = Column(String, unique=True, nullable=False, index=True)
     phone = Column(String, nullable=False)
     address = Column(String, nullable=False)
+    is_active = Column(Boolean, default=True, nullable=False)
     created_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=None, onupdate=datetime.datetime.utcnow, nullable=True)
 
@@ -58,6 +66,9 @@ class Project(Base):
     budget = Column(Float, nullable=True)
     revenue = Column(Float, default=0.0, nullable=True)
 
+    # A customer's projects, listed in id order
+    __table_args__ = (Index("ix_projects_customer_id_id", "customer_id", "id"),)
+
     # Relationships
     customer = relationship("Customer", back_populates="projects")
     interactions = relationship("Interaction", back_populates="project", cascade="all, delete-orphan")
@@ -75,6 +86,18 @@ class Vendor(Base):
     created_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=None, onupdate=datetime.datetime.utcnow, nullable=True)
 
+class VendorProject(Base):
+    __tablename__ = "vendor_projects"
+
+    # A vendor's assignment to a project: "roofing subcontractor", "lumber supplier", ...
+    id = Column(Integer, primary_key=True, index=True)
+    vendor_id = Column(Integer, ForeignKey("vendors.id", ondelete="CASCADE"), nullable=False, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True)
+    role = Column(String, nullable=True)
+    start_date = Column(DateTime, nullable=True)
+    end_date = Column(DateTime, nullable=True)
+    status = Column(String, nullable=True)
+
 class Interaction(Base):
     __tablename__ = "interactions"
 
@@ -86,6 +109,12 @@ class Interaction(Base):
     created_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=None, onupdate=datetime.datetime.utcnow, nullable=True)
 
+    __table_args__ = (
+        # A customer's interactions, paged in id order
+        Index("ix_interactions_customer_id_id", "customer_id", "id"),
+        Index("ix_interactions_project_id", "project_id"),
+    )
+
     # Relationships
     customer = relationship("Customer", back_populates="interactions")
     project = relationship("Project", back_populates="interactions")
@@ -95,12 +124,23 @@ class Notification(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
-    message = Column(Text, nullable=False)
-    notification_type = Column(String, nullable=False)
+    description = Column(Text, nullable=True)
+    # Stored by value so the API and the frontend can use "follow_up", "lead", ...
+    type = Column(Enum(NotificationType, values_callable=lambda types: [t.value for t in types]), nullable=False)
     customer_id = Column(Integer, ForeignKey("customers.id", ondelete="CASCADE"), nullable=True)
     project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=True)
+    due_date = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
-    read = Column(Boolean, default=False, nullable=False)
+    is_read = Column(Boolean, default=False, nullable=False)
+
+    __table_args__ = (
+        # The unread list, paged in id order
+        Index("ix_notifications_is_read_id", "is_read", "id"),
+        # Unread notifications coming due
+        Index("ix_notifications_is_read_due_date", "is_read", "due_date"),
+        Index("ix_notifications_customer_id", "customer_id"),
+        Index("ix_notifications_project_id", "project_id"),
+    )
 
     # Relationships
     customer = relationship("Customer", back_populates="notifications")
@@ -112,12 +152,54 @@ class Lead(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     email = Column(String, nullable=False, index=True)
-    phone = Column(String, nullable=False)
+    # Optional on the public website form
+    phone = Column(String, nullable=True)
     address = Column(String, nullable=True)
     source = Column(Enum(LeadSource), nullable=False)
     status = Column(Enum(LeadStatus), nullable=False, default=LeadStatus.NEW)
     notes = Column(Text, nullable=True)
+    project_type = Column(String, nullable=True)
+    description = Column(Text, nullable=True)
+    last_contact = Column(DateTime, nullable=True)
+    next_follow_up = Column(DateTime, nullable=True)
+    expected_value = Column(Float, nullable=True)
     created_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=None, onupdate=datetime.datetime.utcnow, nullable=True)
     converted_at = Column(DateTime, nullable=True)
     converted_to_customer_id = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        # Leads filtered by status, paged in id order
+        Index("ix_leads_status_id", "status", "id"),
+        Index("ix_leads_converted_to_customer_id", "converted_to_customer_id"),
+        # Follow-ups coming due, for the reminder scheduler
+        Index("ix_leads_next_follow_up", "next_follow_up"),
+    )
+
+class DashboardCounter(Base):
+    __tablename__ = "dashboard_counters"
+
+    # One row per (entity, status), kept in step with the writes in main.py
+    entity = Column(String, primary_key=True)
+    status = Column(String, primary_key=True)
+    count = Column(Integer, default=0, nullable=False)
+
+class SchedulerCursor(Base):
+    __tablename__ = "scheduler_cursors"
+
+    # How far a reminder stream has been delivered, in (due time, id) order:
+    # rows up to and including (due_at, row_id) are done, and a null row_id
+    # covers every row due at due_at
+    name = Column(String, primary_key=True)
+    due_at = Column(DateTime, nullable=False)
+    row_id = Column(Integer, nullable=True)
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    # A website form submission that has been written, so a retry of it is
+    # answered with the same lead instead of creating another
+    key = Column(String, primary_key=True)
+    lead_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
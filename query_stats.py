@@ -0,0 +1,72 @@
+import logging
+import os
+import time
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+import metrics
+import slow_queries
+
+logger = logging.getLogger(__name__)
+
+# Off by default; set QUERY_COUNT_HEADER=1 to report per-request statement
+# counts, e.g. while checking an endpoint for N+1 loading
+QUERY_COUNT_ENABLED = os.getenv("QUERY_COUNT_HEADER", "").lower() in ("1", "true", "yes")
+QUERY_COUNT_HEADER = "X-Query-Count"
+
+
+def before_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+    connection.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def after_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - connection.info["query_started"].pop()
+    metrics.DB_QUERY_SECONDS.observe(elapsed)
+    stats = metrics.request_query_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.seconds += elapsed
+    if elapsed * 1000 >= slow_queries.SLOW_QUERY_THRESHOLD_MS:
+        slow_queries.record_if_slow(connection, statement, parameters, executemany, elapsed, metrics.current_route())
+
+
+def handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_started"):
+        connection.info["query_started"].pop()
+        metrics.DB_QUERY_ERRORS.inc()
+
+
+def install_query_hooks(*engines):
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", after_cursor_execute)
+        event.listen(engine, "handle_error", handle_error)
+
+
+class QueryCountMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats, token = metrics.start_request_stats(scope)
+
+        async def send_with_count(message: Message):
+            if message["type"] == "http.response.start":
+                # Statements issued by streaming bodies after this point are not included
+                headers = MutableHeaders(scope=message)
+                headers[QUERY_COUNT_HEADER] = str(stats.queries)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_count)
+        finally:
+            if token is not None:
+                metrics.request_query_stats.reset(token)
@@ -0,0 +1,218 @@
+import ipaddress
+import logging
+import math
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+import orjson
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+import metrics
+from idempotency import ExpiringLRU
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1").lower() in ("1", "true", "yes")
+# "METHOD /path" pairs open to the internet, comma separated. POST /leads/
+# is left out: staff entering leads share one office address.
+RATE_LIMITED_ROUTES = os.getenv("RATE_LIMITED_ROUTES", "POST /api/website-form")
+# Each client IP, on each limited route
+RATE_LIMIT_PER_IP_PER_MINUTE = float(os.getenv("RATE_LIMIT_PER_IP_PER_MINUTE", "10"))
+RATE_LIMIT_IP_BURST = int(os.getenv("RATE_LIMIT_IP_BURST", "5"))
+# All clients together, on each limited route
+RATE_LIMIT_ROUTE_PER_SECOND = float(os.getenv("RATE_LIMIT_ROUTE_PER_SECOND", "20"))
+RATE_LIMIT_ROUTE_BURST = int(os.getenv("RATE_LIMIT_ROUTE_BURST", "40"))
+# Requests a limited route may have in progress at once. Kept below the
+# database pool (5 + 10 overflow) so the dashboard always gets connections.
+RATE_LIMIT_MAX_CONCURRENCY = int(os.getenv("RATE_LIMIT_MAX_CONCURRENCY", "4"))
+# Relays and proxies whose X-Forwarded-For entries are believed, comma
+# separated networks: send_email.php posting from the same host, and the
+# hosting proxy (Render, nginx) on a private network
+RATE_LIMIT_TRUSTED_PROXIES = os.getenv(
+    "RATE_LIMIT_TRUSTED_PROXIES", "127.0.0.0/8,::1/128,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16,fc00::/7"
+)
+# Client buckets kept per route; the least recently seen are dropped first
+RATE_LIMIT_MAX_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "10000"))
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def take(self, now: float) -> float:
+        # 0 if a token was taken, otherwise seconds until one is available
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else 60.0
+
+    def give_back(self):
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+
+class RouteLimiter:
+    def __init__(self, route: str):
+        self.route = route
+        self.clients = ExpiringLRU(RATE_LIMIT_MAX_CLIENTS)
+        self.bucket = TokenBucket(RATE_LIMIT_ROUTE_PER_SECOND, RATE_LIMIT_ROUTE_BURST)
+        self.in_flight = 0
+        self.allowed = 0
+        self.limited_client = 0
+        self.limited_route = 0
+        self.shed = 0
+        self.unattributed = 0
+
+    def admit(self, client: Optional[str]) -> Tuple[Optional[int], float]:
+        # (None, 0) to go ahead, otherwise the status to answer with and the
+        # seconds to suggest in Retry-After. Without a client address only
+        # the route bucket applies.
+        if self.in_flight >= RATE_LIMIT_MAX_CONCURRENCY:
+            self.shed += 1
+            return 503, 1.0
+        now = time.monotonic()
+        bucket = None
+        if client is None:
+            self.unattributed += 1
+        else:
+            bucket = self.clients.get(client)
+            if bucket is None:
+                bucket = TokenBucket(RATE_LIMIT_PER_IP_PER_MINUTE / 60, RATE_LIMIT_IP_BURST)
+                self.clients.put(client, bucket)
+            wait = bucket.take(now)
+            if wait:
+                self.limited_client += 1
+                return 429, wait
+        wait = self.bucket.take(now)
+        if wait:
+            # Not this client's fault: its token is not spent
+            if bucket is not None:
+                bucket.give_back()
+            self.limited_route += 1
+            return 429, wait
+        self.allowed += 1
+        return None, 0.0
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "allowed": self.allowed,
+            "limited_client": self.limited_client,
+            "limited_route": self.limited_route,
+            "shed": self.shed,
+            "unattributed": self.unattributed,
+            "clients_tracked": len(self.clients.entries)
+        }
+
+
+def route_key(method: str, path: str) -> str:
+    # Exact paths: "/leads" only redirects to "/leads/", at no cost worth a token
+    return f"{method.upper()} {path}"
+
+
+def parse_routes(spec: str) -> Dict[str, RouteLimiter]:
+    limiters = {}
+    for entry in spec.split(","):
+        if not entry.strip():
+            continue
+        method, _, path = entry.strip().partition(" ")
+        key = route_key(method, path.strip())
+        limiters[key] = RouteLimiter(key)
+    return limiters
+
+
+limiters = parse_routes(RATE_LIMITED_ROUTES)
+
+REASONS = {503: "concurrency", 429: "rate"}
+
+
+def parse_networks(spec: str) -> list:
+    return [ipaddress.ip_network(entry.strip(), strict=False) for entry in spec.split(",") if entry.strip()]
+
+
+trusted_networks = parse_networks(RATE_LIMIT_TRUSTED_PROXIES)
+
+
+def is_trusted(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in trusted_networks)
+
+
+def client_address(scope: Scope) -> Optional[str]:
+    # Each trusted hop appended the address it got the request from, so the
+    # client is the nearest address that is not a trusted hop; entries left
+    # of it are the client's own say and are ignored. None when only trusted
+    # hops are known: a relay that did not pass the visitor on would
+    # otherwise put every visitor in its one bucket.
+    client = scope.get("client")
+    hops = [client[0] if client else "unknown"]
+    forwarded = Headers(scope=scope).get("x-forwarded-for")
+    if forwarded and is_trusted(hops[0]):
+        hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()] + hops
+    for address in reversed(hops):
+        if not is_trusted(address):
+            return address
+    return None
+
+
+class RateLimitMiddleware:
+    # Runs before routing, so a refused request never reaches a dependency
+    # and never checks out a database connection. Limits are per process:
+    # with several workers each enforces them on its own share.
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        limiter = None
+        if scope["type"] == "http" and RATE_LIMIT_ENABLED:
+            limiter = limiters.get(route_key(scope["method"], scope["path"]))
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        status, retry_after = limiter.admit(client_address(scope))
+        if status is not None:
+            metrics.REQUESTS_REFUSED.labels(limiter.route, REASONS[status]).inc()
+            body = orjson.dumps({"detail": "Too many requests" if status == 429 else "Server busy, try again shortly"})
+            await send({
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+                ]
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        limiter.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.in_flight -= 1
+
+
+def stats() -> dict:
+    return {
+        "enabled": RATE_LIMIT_ENABLED,
+        "per_ip_per_minute": RATE_LIMIT_PER_IP_PER_MINUTE,
+        "ip_burst": RATE_LIMIT_IP_BURST,
+        "route_per_second": RATE_LIMIT_ROUTE_PER_SECOND,
+        "route_burst": RATE_LIMIT_ROUTE_BURST,
+        "max_concurrency": RATE_LIMIT_MAX_CONCURRENCY,
+        "trusted_proxies": [str(network) for network in trusted_networks],
+        "routes": {route: limiter.stats() for route, limiter in limiters.items()}
+    }
@@ -0,0 +1,294 @@
+import asyncio
+import datetime
+import logging
+import os
+from typing import Optional
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import live_events
+import migrations
+import models
+from database import AsyncSessionLocal, engine
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+REMINDERS_ENABLED = os.getenv("REMINDERS_ENABLED", "1").lower() in ("1", "true", "yes")
+REMINDER_POLL_SECONDS = float(os.getenv("REMINDER_POLL_SECONDS", "5"))
+REMINDER_BATCH_SIZE = int(os.getenv("REMINDER_BATCH_SIZE", "500"))
+# On first start, reminders that came due this long ago are still delivered;
+# anything older is considered handled
+REMINDER_CATCHUP_HOURS = float(os.getenv("REMINDER_CATCHUP_HOURS", "24"))
+# Scans stop this far short of now. A reminder is due no earlier than the
+# start of the transaction that wrote it (follow_up_time, created_at), so
+# one that commits within this long of its due time is still picked up;
+# the price is firing up to this late.
+REMINDER_GRACE_SECONDS = float(os.getenv("REMINDER_GRACE_SECONDS", "10"))
+# How often a worker that is not the leader checks whether the leader is gone
+LEADER_RETRY_SECONDS = 15
+
+# pg_advisory_lock key for the scheduler leader, next to the startup lock's
+SCHEDULER_LOCK_KEY = 0x43524D02
+
+LEAD_FOLLOW_UPS = "lead_follow_ups"
+DUE_NOTIFICATIONS = "due_notifications"
+# Notifications that are tasks with a due time, as opposed to plain alerts
+REMINDER_TYPES = (models.NotificationType.FOLLOW_UP, models.NotificationType.TASK_REMINDER)
+OPEN_LEAD_STATUSES = (
+    models.LeadStatus.NEW, models.LeadStatus.CONTACTED, models.LeadStatus.QUALIFIED,
+    models.LeadStatus.PROPOSAL, models.LeadStatus.NEGOTIATION,
+)
+
+
+def follow_up_time(value: Optional[datetime.datetime]) -> Optional[datetime.datetime]:
+    # Stored as naive UTC like every other timestamp. A time the scheduler has
+    # already passed would never fire, so it is moved up to now.
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return max(value, datetime.datetime.utcnow())
+
+
+class LeaderLease:
+    # Only one process runs the scheduler: whoever holds a session-level
+    # advisory lock (PostgreSQL) or an exclusive file lock (SQLite). The lock
+    # goes away with the process, so a crashed leader is replaced on the
+    # next retry.
+
+    def __init__(self, bind: Engine):
+        self.bind = bind
+        self.connection = None
+        self.lock_file = None
+
+    def try_acquire(self) -> bool:
+        if self.bind.dialect.name == "postgresql":
+            connection = self.bind.connect()
+            if connection.exec_driver_sql(f"SELECT pg_try_advisory_lock({SCHEDULER_LOCK_KEY})").scalar():
+                self.connection = connection
+                return True
+            connection.close()
+            return False
+        if fcntl is None:
+            return True
+        lock_file = open(migrations.lock_file_path(self.bind, "scheduler"), "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+        self.lock_file = lock_file
+        return True
+
+    def is_held(self) -> bool:
+        # The advisory lock lives and dies with its connection
+        if self.connection is None:
+            return True
+        try:
+            self.connection.exec_driver_sql("SELECT 1")
+            return True
+        except Exception:
+            self.release()
+            return False
+
+    def release(self):
+        if self.connection is not None:
+            try:
+                self.connection.exec_driver_sql(f"SELECT pg_advisory_unlock({SCHEDULER_LOCK_KEY})")
+                self.connection.close()
+            except Exception:
+                pass
+            self.connection = None
+        if self.lock_file is not None:
+            fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+            self.lock_file.close()
+            self.lock_file = None
+
+
+async def load_cursor(db: AsyncSession, name: str, now: datetime.datetime) -> models.SchedulerCursor:
+    # Locked for the batch, so even two leaders (say, around a network split)
+    # take turns instead of delivering the same rows twice
+    result = await db.execute(
+        select(models.SchedulerCursor).where(models.SchedulerCursor.name == name).with_for_update()
+    )
+    cursor = result.scalars().first()
+    if cursor is None:
+        cursor = models.SchedulerCursor(
+            name=name, due_at=now - datetime.timedelta(hours=REMINDER_CATCHUP_HOURS), row_id=None
+        )
+        db.add(cursor)
+    return cursor
+
+
+def after_cursor(due_column, id_column, cursor: models.SchedulerCursor):
+    # Keyset condition on (due time, id). Its leading due_date >= bound keeps
+    # it a range scan on the due-time index.
+    if cursor.row_id is None:
+        return due_column > cursor.due_at
+    return and_(
+        due_column >= cursor.due_at,
+        or_(due_column > cursor.due_at, id_column > cursor.row_id)
+    )
+
+
+def advance_cursor(cursor: models.SchedulerCursor, rows, due_attribute: str):
+    # Only as far as the last delivered row. A row committed after the scan
+    # but due before that row is never delivered; REMINDER_GRACE_SECONDS is
+    # what keeps such rows out of reach of the scan.
+    if rows:
+        cursor.due_at, cursor.row_id = getattr(rows[-1], due_attribute), rows[-1].id
+
+
+def follow_up_notification(lead) -> models.Notification:
+    return models.Notification(
+        type=models.NotificationType.FOLLOW_UP,
+        title=f"Follow up with {lead.name}",
+        description=f"Lead #{lead.id} ({lead.email}) is due for a follow-up",
+        customer_id=lead.converted_to_customer_id,
+        due_date=lead.next_follow_up,
+        created_at=datetime.datetime.utcnow()
+    )
+
+
+class ReminderScheduler:
+    def __init__(self, bind: Engine = engine):
+        self.lease = LeaderLease(bind)
+        self.task: Optional[asyncio.Task] = None
+        self.leader = False
+        self.follow_ups_fired = 0
+        self.notifications_delivered = 0
+        self.last_tick_at: Optional[datetime.datetime] = None
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        if self.leader:
+            await asyncio.get_running_loop().run_in_executor(None, self.lease.release)
+            self.leader = False
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            delay = REMINDER_POLL_SECONDS
+            try:
+                if not self.leader:
+                    self.leader = await loop.run_in_executor(None, self.lease.try_acquire)
+                    if self.leader:
+                        logger.info("Reminder scheduler is running in this process")
+                    else:
+                        delay = LEADER_RETRY_SECONDS
+                elif not await loop.run_in_executor(None, self.lease.is_held):
+                    logger.warning("Reminder scheduler lost its leader lock")
+                    self.leader = False
+                    delay = 0
+                if self.leader:
+                    await self.tick()
+            except Exception as e:
+                logger.error(f"Reminder scheduler error: {str(e)}")
+            await asyncio.sleep(delay)
+
+    async def tick(self):
+        # Each tick is a handful of index range scans that come back empty
+        # unless something is due, however many follow-ups are pending
+        now = datetime.datetime.utcnow()
+        horizon = now - datetime.timedelta(seconds=REMINDER_GRACE_SECONDS)
+        while await self.deliver_due_notifications(horizon) == REMINDER_BATCH_SIZE:
+            pass
+        while await self.fire_lead_follow_ups(horizon) == REMINDER_BATCH_SIZE:
+            pass
+        self.last_tick_at = now
+
+    async def deliver_due_notifications(self, now: datetime.datetime) -> int:
+        async with AsyncSessionLocal() as db:
+            cursor = await load_cursor(db, DUE_NOTIFICATIONS, now)
+            result = await db.execute(
+                select(
+                    models.Notification.id, models.Notification.title, models.Notification.type,
+                    models.Notification.customer_id, models.Notification.project_id, models.Notification.due_date
+                ).where(
+                    models.Notification.is_read == False,
+                    models.Notification.due_date <= now,
+                    after_cursor(models.Notification.due_date, models.Notification.id, cursor),
+                    models.Notification.type.in_(REMINDER_TYPES),
+                    # Scheduled ahead of time. Notifications created already
+                    # due, like the follow-ups fired below, were announced
+                    # when they were created.
+                    models.Notification.due_date > models.Notification.created_at
+                ).order_by(models.Notification.due_date, models.Notification.id).limit(REMINDER_BATCH_SIZE)
+            )
+            rows = result.all()
+            advance_cursor(cursor, rows, "due_date")
+            await db.commit()
+
+        for row in rows:
+            live_events.publish("notification.due", live_events.notification_event(row))
+        self.notifications_delivered += len(rows)
+        if rows:
+            logger.info(f"Delivered {len(rows)} due reminders")
+        return len(rows)
+
+    async def fire_lead_follow_ups(self, now: datetime.datetime) -> int:
+        async with AsyncSessionLocal() as db:
+            cursor = await load_cursor(db, LEAD_FOLLOW_UPS, now)
+            result = await db.execute(
+                select(
+                    models.Lead.id, models.Lead.name, models.Lead.email,
+                    models.Lead.next_follow_up, models.Lead.converted_to_customer_id
+                ).where(
+                    models.Lead.next_follow_up <= now,
+                    after_cursor(models.Lead.next_follow_up, models.Lead.id, cursor),
+                    models.Lead.status.in_(OPEN_LEAD_STATUSES)
+                ).order_by(models.Lead.next_follow_up, models.Lead.id).limit(REMINDER_BATCH_SIZE)
+            )
+            rows = result.all()
+            notifications = [follow_up_notification(lead) for lead in rows]
+            db.add_all(notifications)
+            advance_cursor(cursor, rows, "next_follow_up")
+            # The notifications and the cursor commit together: a batch is
+            # fired exactly once, even if the leader dies halfway
+            await db.commit()
+
+        for notification in notifications:
+            event = live_events.notification_event(notification)
+            live_events.publish("notification.created", event)
+            live_events.publish("notification.due", event)
+        self.follow_ups_fired += len(notifications)
+        if notifications:
+            logger.info(f"Fired {len(notifications)} lead follow-up reminders")
+        return len(rows)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": REMINDERS_ENABLED,
+            "running": self.task is not None and not self.task.done(),
+            "leader": self.leader,
+            "follow_ups_fired": self.follow_ups_fired,
+            "notifications_delivered": self.notifications_delivered,
+            "last_tick_at": self.last_tick_at
+        }
+
+
+reminder_scheduler: Optional[ReminderScheduler] = None
+
+
+def get_reminder_scheduler() -> ReminderScheduler:
+    global reminder_scheduler
+    if reminder_scheduler is None:
+        reminder_scheduler = ReminderScheduler()
+    return reminder_scheduler
@@ -1,7 +1,7 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, conlist
 from datetime import datetime, date
 from typing import List, Optional
-from models import ProjectStatus, LeadStatus, LeadSource
+from models import ProjectStatus, LeadStatus, LeadSource, NotificationType
 
 class CustomerBase(BaseModel):
     name: str
@@ -105,7 +105,7 @@ class Interaction(InteractionBase):
 class NotificationBase(BaseModel):
     title: str
     description: str
-    type: str
+    type: NotificationType
     customer_id: int | None = None
     project_id: int | None = None
     due_date: Optional[datetime] = None
@@ -127,6 +127,15 @@ class Notification(NotificationBase):
     class Config:
         from_attributes = True
 
+class WebsiteFormData(BaseModel):
+    name: str
+    email: str
+    phone: Optional[str] = None
+    message: Optional[str] = None
+    project_type: Optional[str] = None
+    address: Optional[str] = None
+    source: Optional[str] = 'Website Contact Form'
+
 class LeadBase(BaseModel):
     name: str
     email: str
@@ -156,3 +165,7 @@ class Lead(LeadBase):
     
     class Config:
         from_attributes = True
+
+class CustomerIdList(BaseModel):
+    # Capped so every IN list stays under SQLite's bound-parameter limit
+    ids: conlist(int, min_items=1, max_items=5000)
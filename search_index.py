@@ -0,0 +1,167 @@
+import logging
+import re
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import Base
+
+logger = logging.getLogger(__name__)
+
+MAX_SEARCH_RESULTS = 100
+
+# (entity, table, code, title column, body columns). The code keeps entity ids
+# apart in the SQLite index: each row is stored under rowid = id * 4 + code.
+SEARCH_DOCUMENTS = [
+    ("customer", "customers", 0, "name", ["email", "address"]),
+    ("lead", "leads", 1, "name", ["address", "notes", "description"]),
+    ("project", "projects", 2, "name", ["description"]),
+    ("interaction", "interactions", 3, "interaction_type", ["notes"]),
+]
+ENTITY_CODES = len(SEARCH_DOCUMENTS)
+
+
+def concat_sql(columns, prefix: str = "") -> str:
+    return " || ' ' || ".join(f"coalesce({prefix}{column}, '')" for column in columns)
+
+
+def pg_vector_sql(title: str, body_columns) -> str:
+    # Must match the indexed expression exactly for the GIN index to be used
+    return (
+        f"(setweight(to_tsvector('english', coalesce({title}, '')), 'A') || "
+        f"setweight(to_tsvector('english', {concat_sql(body_columns)}), 'B'))"
+    )
+
+
+def sqlite_index_statements():
+    statements = [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(title, body, tokenize='porter unicode61')"
+    ]
+    # Triggers keep the index in step with every write, including bulk Core
+    # inserts and cascaded deletes that never pass through the ORM
+    for entity, table, code, title, body in SEARCH_DOCUMENTS:
+        insert_new = (
+            f"INSERT INTO search_index(rowid, title, body) "
+            f"VALUES (new.id * {ENTITY_CODES} + {code}, new.{title}, {concat_sql(body, 'new.')});"
+        )
+        delete_old = f"DELETE FROM search_index WHERE rowid = old.id * {ENTITY_CODES} + {code};"
+        statements += [
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_insert AFTER INSERT ON {table} BEGIN {insert_new} END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_update AFTER UPDATE ON {table} BEGIN {delete_old} {insert_new} END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_delete AFTER DELETE ON {table} BEGIN {delete_old} END",
+        ]
+    return statements
+
+
+def postgresql_index_statements():
+    return [
+        f"CREATE INDEX IF NOT EXISTS ix_{table}_search ON {table} USING GIN ({pg_vector_sql(title, body)})"
+        for entity, table, code, title, body in SEARCH_DOCUMENTS
+    ]
+
+
+def create_search_index(connection):
+    if connection.dialect.name == "sqlite":
+        for statement in sqlite_index_statements():
+            connection.exec_driver_sql(statement)
+        rebuild_search_index(connection)
+    elif connection.dialect.name == "postgresql":
+        for statement in postgresql_index_statements():
+            connection.exec_driver_sql(statement)
+    logger.info("Search index installed")
+
+
+def drop_search_index(connection):
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql("DROP TABLE IF EXISTS search_index")
+
+
+def drop_search_triggers(connection):
+    # For bulk loads: create_search_index puts them back and reindexes in one pass
+    if connection.dialect.name == "sqlite":
+        for entity, table, code, title, body in SEARCH_DOCUMENTS:
+            for action in ("insert", "update", "delete"):
+                connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {table}_search_{action}")
+
+
+def rebuild_search_index(connection):
+    # PostgreSQL expression indexes never drift; only the SQLite FTS table needs repopulating
+    if connection.dialect.name != "sqlite":
+        return
+    connection.exec_driver_sql("DELETE FROM search_index")
+    for entity, table, code, title, body in SEARCH_DOCUMENTS:
+        connection.exec_driver_sql(
+            f"INSERT INTO search_index(rowid, title, body) "
+            f"SELECT id * {ENTITY_CODES} + {code}, {title}, {concat_sql(body)} FROM {table}"
+        )
+
+
+# Schema lifecycle: the index is created and dropped together with the tables
+event.listen(Base.metadata, "after_create", lambda target, connection, **kw: create_search_index(connection))
+event.listen(Base.metadata, "before_drop", lambda target, connection, **kw: drop_search_index(connection))
+
+
+def search_terms(query: str):
+    return re.findall(r"\w+", query.lower())
+
+
+async def search(db: AsyncSession, query: str, skip: int = 0, limit: int = 20):
+    terms = search_terms(query)
+    if not terms:
+        return []
+    limit = max(1, min(limit, MAX_SEARCH_RESULTS))
+
+    if db.bind.dialect.name == "postgresql":
+        return await search_postgresql(db, terms, skip, limit)
+    return await search_sqlite(db, terms, skip, limit)
+
+
+async def search_sqlite(db: AsyncSession, terms, skip: int, limit: int):
+    # Any term may match and bm25 ranks rows matching more (and rarer) terms
+    # first; the last term is a prefix so partially typed words still hit
+    match = " OR ".join(f'"{term}"' for term in terms) + "*"
+    result = await db.execute(
+        text(
+            "SELECT rowid, title, snippet(search_index, 1, '[', ']', '...', 12) AS snippet, "
+            "bm25(search_index, 5.0, 1.0) AS score "
+            "FROM search_index WHERE search_index MATCH :match "
+            "ORDER BY score LIMIT :limit OFFSET :skip"
+        ),
+        {"match": match, "limit": limit, "skip": skip}
+    )
+    entities = {code: entity for entity, table, code, title, body in SEARCH_DOCUMENTS}
+    return [
+        {
+            "type": entities[rowid % ENTITY_CODES],
+            "id": rowid // ENTITY_CODES,
+            "title": title,
+            "snippet": snippet,
+            "rank": -score
+        }
+        for rowid, title, snippet, score in result
+    ]
+
+
+async def search_postgresql(db: AsyncSession, terms, skip: int, limit: int):
+    tsquery = " | ".join(terms) + ":*"
+    hits = " UNION ALL ".join(
+        f"SELECT '{entity}' AS type, id, {title} AS title, {concat_sql(body)} AS body, "
+        f"ts_rank_cd({pg_vector_sql(title, body)}, query) AS rank "
+        f"FROM {table}, query WHERE {pg_vector_sql(title, body)} @@ query"
+        for entity, table, code, title, body in SEARCH_DOCUMENTS
+    )
+    result = await db.execute(
+        text(
+            f"WITH query AS (SELECT to_tsquery('english', :tsquery) AS query), "
+            f"page AS (SELECT * FROM ({hits}) hits ORDER BY rank DESC LIMIT :limit OFFSET :skip) "
+            f"SELECT type, id, title, "
+            f"ts_headline('english', body, (SELECT query FROM query), "
+            f"'StartSel=[, StopSel=], MaxWords=12, MinWords=4') AS snippet, rank "
+            f"FROM page ORDER BY rank DESC"
+        ),
+        {"tsquery": tsquery, "limit": limit, "skip": skip}
+    )
+    return [
+        {"type": type_, "id": id_, "title": title, "snippet": snippet, "rank": rank}
+        for type_, id_, title, snippet, rank in result
+    ]
@@ -0,0 +1,90 @@
+import logging
+
+from sqlalchemy.orm import Session
+
+import dashboard_stats
+import models
+from database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+# Sample rows for local development and demos. Only runs when explicitly
+# requested (SEED_SAMPLE_DATA=1 or `python seed_data.py`) and never on top of
+# existing data.
+def seed_sample_data(db: Session) -> bool:
+    if db.query(models.Customer.id).first() is not None:
+        logger.info("Database already has customers, skipping sample data")
+        return False
+
+    try:
+        # Create sample customers
+        customer1 = models.Customer(
+            name="John Doe",
+            email="john@example.com",
+            phone="555-0101",
+            address="123 Main St"
+        )
+        customer2 = models.Customer(
+            name="Jane Smith",
+            email="jane@example.com",
+            phone="555-0102",
+            address="456 Oak Ave"
+        )
+        db.add_all([customer1, customer2])
+        db.commit()
+        logger.info("Added sample customers")
+
+        # Create sample projects
+        project1 = models.Project(
+            name="Kitchen Renovation",
+            description="Full kitchen remodel",
+            status=models.ProjectStatus.IN_PROGRESS,
+            customer_id=customer1.id
+        )
+        project2 = models.Project(
+            name="Bathroom Update",
+            description="Master bathroom renovation",
+            status=models.ProjectStatus.PENDING,
+            customer_id=customer2.id
+        )
+        db.add_all([project1, project2])
+        db.commit()
+        logger.info("Added sample projects")
+
+        # Create sample leads
+        lead1 = models.Lead(
+            name="Bob Wilson",
+            email="bob@example.com",
+            phone="555-0103",
+            address="789 Pine Rd",
+            source=models.LeadSource.WEBSITE,
+            status=models.LeadStatus.NEW,
+            notes="Interested in kitchen remodel"
+        )
+        db.add(lead1)
+        db.commit()
+        logger.info("Added sample lead")
+
+        dashboard_stats.rebuild_counters(db)
+        return True
+
+    except Exception as sample_data_error:
+        logger.error(f"Error adding sample data: {str(sample_data_error)}")
+        db.rollback()
+        raise
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    session = SessionLocal()
+    try:
+        print("Seeding sample data...")
+        if seed_sample_data(session):
+            print("Sample data added.")
+        else:
+            print("Database is not empty, nothing to do.")
+    except Exception as e:
+        print(f"An error occurred: {e}")
+    finally:
+        session.close()
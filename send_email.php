@@ -67,9 +67,15 @@ if ($_SERVER['REQUEST_METHOD'] === 'POST') {
     // Set cURL options for secure API call
     curl_setopt($ch, CURLOPT_POST, 1);
     curl_setopt($ch, CURLOPT_POSTFIELDS, json_encode($crmData));
+    // Pass the visitor on, so the CRM rate-limits each visitor rather than this relay
+    $forwardedFor = $_SERVER['REMOTE_ADDR'];
+    if (!empty($_SERVER['HTTP_X_FORWARDED_FOR'])) {
+        $forwardedFor = $_SERVER['HTTP_X_FORWARDED_FOR'] . ', ' . $forwardedFor;
+    }
     curl_setopt($ch, CURLOPT_HTTPHEADER, [
         'Content-Type: application/json',
-        'Accept: application/json'
+        'Accept: application/json',
+        'X-Forwarded-For: ' . $forwardedFor
     ]);
     curl_setopt($ch, CURLOPT_RETURNTRANSFER, true);
     curl_setopt($ch, CURLOPT_TIMEOUT, $crmConfig['timeout']);
@@ -88,12 +94,13 @@ if ($_SERVER['REQUEST_METHOD'] === 'POST') {
     // Prepare final response
     $response = [
         'email_sent' => $emailSent,
-        'crm_status' => $crmHttpCode == 200 ? 'Lead created' : 'Failed to create lead',
+        'crm_status' => in_array($crmHttpCode, [200, 202]) ? 'Lead created' : 'Failed to create lead',
         'crm_response' => json_decode($crmResponse, true),
         'crm_http_code' => $crmHttpCode
     ];
 
-    if ($emailSent && $crmHttpCode == 200) {
+    // 202 means the CRM queued the lead for a background write
+    if ($emailSent && in_array($crmHttpCode, [200, 202])) {
         // Successful submission
         header('Content-Type: application/json');
         echo json_encode([
@@ -0,0 +1,105 @@
+import collections
+import datetime
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200"))
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", "100"))
+# EXPLAIN ANALYZE runs the statement a second time, so it is opt-in
+SLOW_QUERY_EXPLAIN_ANALYZE = os.getenv("SLOW_QUERY_EXPLAIN_ANALYZE", "").lower() in ("1", "true", "yes")
+
+slow_query_log = collections.deque(maxlen=SLOW_QUERY_LOG_SIZE)
+slow_query_lock = threading.Lock()
+
+
+def redact(value):
+    # Ids, flags and dates help reproduce a plan; free text may be personal data
+    if isinstance(value, (str, bytes)):
+        return f"<redacted {len(value)} chars>"
+    if isinstance(value, (list, tuple)):
+        return type(value)(redact(item) for item in value)
+    if isinstance(value, dict):
+        return {key: redact(item) for key, item in value.items()}
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return value
+
+
+def explain(connection, statement: str, parameters, analyze: bool = SLOW_QUERY_EXPLAIN_ANALYZE):
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        prefix = "EXPLAIN QUERY PLAN "
+    elif dialect == "postgresql":
+        prefix = "EXPLAIN (ANALYZE, BUFFERS) " if analyze else "EXPLAIN "
+    else:
+        return None
+
+    # Straight on the DBAPI connection, so the EXPLAIN is neither timed nor
+    # recorded by the engine hooks
+    cursor = connection.connection.cursor()
+    try:
+        if dialect == "postgresql":
+            # The request's transaction is still open: a failed EXPLAIN would
+            # abort it, and EXPLAIN ANALYZE of a WITH ... DELETE would write.
+            # Both are undone by rolling back to a savepoint.
+            cursor.execute("SAVEPOINT slow_query_explain")
+            try:
+                cursor.execute(prefix + statement, parameters)
+                rows = cursor.fetchall()
+            finally:
+                cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+                cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+        else:
+            cursor.execute(prefix + statement, parameters)
+            rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    if dialect == "sqlite":
+        # (id, parent, notused, detail): indent each step under its parent
+        depth = {0: -1}
+        lines = []
+        for node_id, parent, _, detail in rows:
+            depth[node_id] = depth.get(parent, -1) + 1
+            lines.append("  " * depth[node_id] + detail)
+        return "\n".join(lines)
+    return "\n".join(row[0] for row in rows)
+
+
+def record_if_slow(connection, statement: str, parameters, executemany: bool, seconds: float, route: str):
+    duration_ms = seconds * 1000
+    if duration_ms < SLOW_QUERY_THRESHOLD_MS:
+        return
+
+    plan = None
+    # Only reads are explained: EXPLAIN ANALYZE would repeat a write
+    if not executemany and statement.lstrip().upper().startswith(("SELECT", "WITH")):
+        try:
+            plan = explain(connection, statement, parameters)
+        except Exception as e:
+            plan = f"EXPLAIN failed: {str(e)}"
+
+    entry = {
+        "recorded_at": datetime.datetime.utcnow().isoformat(),
+        "duration_ms": round(duration_ms, 3),
+        "route": route,
+        "statement": statement,
+        "parameters": redact(parameters),
+        "executemany": executemany,
+        "plan": plan,
+    }
+    with slow_query_lock:
+        slow_query_log.append(entry)
+    logger.warning(f"Slow query ({duration_ms:.1f} ms) from {route}: {' '.join(statement.split())[:200]}")
+
+
+def recent_slow_queries() -> list:
+    with slow_query_lock:
+        return list(reversed(slow_query_log))
+
+
+def clear_slow_queries():
+    with slow_query_lock:
+        slow_query_log.clear()
@@ -8,6 +8,128 @@ function getApiUrl(endpoint) {
     return `${API_BASE_URL}${endpoint}`;
 }
 
+// Rows requested per page from the list endpoints
+const PAGE_SIZE = 25;
+
+// Last response per URL, revalidated with its ETag on the next request.
+// An unchanged resource comes back as an empty 304 and is served from here.
+const responseCache = new Map();
+
+async function fetchCached(endpoint) {
+    const url = getApiUrl(endpoint);
+    const cached = responseCache.get(url);
+    const headers = cached ? { 'If-None-Match': cached.etag } : {};
+    // no-store keeps the browser cache out of the way so 304s reach us as-is
+    const response = await fetch(url, { headers, cache: 'no-store' });
+    if (response.status === 304 && cached) {
+        return { ...cached, notModified: true };
+    }
+    if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    const entry = {
+        data: await response.json(),
+        etag: response.headers.get('ETag'),
+        nextCursor: response.headers.get('X-Next-Cursor')
+    };
+    if (entry.etag) {
+        responseCache.set(url, entry);
+    }
+    return { ...entry, notModified: false };
+}
+
+// Everything the first view shows comes from /api/bootstrap in one request.
+// The loaders take their first page from it instead of each asking the
+// server; later loads (refreshes, "Load more") go to the list endpoints.
+const primedResponses = new Map();
+let bootstrapPromise = null;
+// Customers with their projects grouped, for the customer/project pickers
+let customerOptions = null;
+
+async function fetchBootstrap() {
+    const response = await fetch(getApiUrl(`/api/bootstrap?limit=${PAGE_SIZE}`));
+    if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    return response.json();
+}
+
+function loadBootstrap() {
+    if (!bootstrapPromise) {
+        bootstrapPromise = fetchBootstrap()
+            .then(data => {
+                const cursors = data.next_cursors;
+                primedResponses.set('/customers/', { items: data.customers, nextCursor: cursors.customers });
+                primedResponses.set('/projects/', { items: data.projects, nextCursor: cursors.projects });
+                primedResponses.set('/vendors/', { items: data.vendors, nextCursor: cursors.vendors });
+                primedResponses.set('/leads/', { items: data.leads, nextCursor: cursors.leads });
+                primedResponses.set('/notifications/', { items: data.notifications, nextCursor: cursors.notifications });
+                primedResponses.set('/interactions/', { items: data.interactions, nextCursor: cursors.interactions });
+                primedResponses.set('/api/dashboard/stats', data.stats);
+                customerOptions = data.customers;
+                return data;
+            })
+            .catch(error => {
+                // The loaders fall back to their own requests
+                console.error('Error loading initial data:', error);
+                return null;
+            });
+    }
+    return bootstrapPromise;
+}
+
+// The bootstrap's copy of an endpoint's first response, handed out once
+async function takePrimed(endpoint) {
+    await loadBootstrap();
+    const primed = primedResponses.get(endpoint);
+    primedResponses.delete(endpoint);
+    return primed;
+}
+
+async function getCustomerOptions() {
+    await loadBootstrap();
+    // Refetched after a customer or project is added
+    if (!customerOptions) {
+        customerOptions = (await fetchBootstrap()).customers;
+    }
+    return customerOptions;
+}
+
+// Fetch one page of a list endpoint in cursor mode.
+// The server returns the cursor for the following page in the X-Next-Cursor header.
+async function fetchPage(endpoint, cursor = null) {
+    if (!cursor) {
+        const primed = await takePrimed(endpoint);
+        if (primed) {
+            return { ...primed, notModified: false };
+        }
+    }
+    const params = new URLSearchParams({ limit: PAGE_SIZE });
+    if (cursor) {
+        params.set('cursor', cursor);
+    }
+    const separator = endpoint.includes('?') ? '&' : '?';
+    const { data, nextCursor, notModified } = await fetchCached(`${endpoint}${separator}${params}`);
+    return { items: data, nextCursor, notModified };
+}
+
+// Show a "Load more" button under a table while there are pages left
+function renderLoadMore(tbody, nextCursor, loadMore) {
+    const container = tbody.closest('table').parentNode;
+    let button = container.querySelector('.load-more');
+    if (!nextCursor) {
+        if (button) button.remove();
+        return;
+    }
+    if (!button) {
+        button = document.createElement('button');
+        button.className = 'btn btn-outline-secondary btn-sm load-more';
+        button.textContent = 'Load more';
+        container.appendChild(button);
+    }
+    button.onclick = () => loadMore(nextCursor);
+}
+
 // Global functions
 function showAlert(message, type) {
     const alertsContainer = document.getElementById('alerts');
@@ -142,11 +264,7 @@ async function convertToCustomer(leadId) {
 
 window.viewCustomer = async function(id) {
     try {
-        const response = await fetch(getApiUrl(`/customers/${id}`));
-        if (!response.ok) {
-            throw new Error(`HTTP error! status: ${response.status}`);
-        }
-        const customer = await response.json();
+        const { data: customer } = await fetchCached(`/customers/${id}`);
         console.log('Customer details:', customer);
 
         const modalContent = `
@@ -187,11 +305,7 @@ window.viewCustomer = async function(id) {
 
 window.viewProject = async function(id) {
     try {
-        const response = await fetch(getApiUrl(`/projects/${id}`));
-        if (!response.ok) {
-            throw new Error(`HTTP error! status: ${response.status}`);
-        }
-        const project = await response.json();
+        const { data: project } = await fetchCached(`/projects/${id}`);
         console.log('Project details:', project); // Debug log
 
         const modalContent = `
@@ -229,11 +343,7 @@ window.viewProject = async function(id) {
 
 window.viewVendor = async function(id) {
     try {
-        const response = await fetch(getApiUrl(`/vendors/${id}`));
-        if (!response.ok) {
-            throw new Error(`HTTP error! status: ${response.status}`);
-        }
-        const vendor = await response.json();
+        const { data: vendor } = await fetchCached(`/vendors/${id}`);
         console.log('Vendor details:', vendor);
 
         const modalContent = `
@@ -270,11 +380,7 @@ window.viewVendor = async function(id) {
 
 window.viewLead = async function(id) {
     try {
-        const response = await fetch(getApiUrl(`/leads/${id}`));
-        if (!response.ok) {
-            throw new Error(`HTTP error! status: ${response.status}`);
-        }
-        const lead = await response.json();
+        const { data: lead } = await fetchCached(`/leads/${id}`);
         currentLeadId = lead.id;
 
         const modalContent = `
@@ -407,16 +513,17 @@ function showAlert(type, message) {
 }
 
 // Update loadLeads function to use the new status badge formatter
-async function loadLeads() {
+async function loadLeads(cursor = null) {
     try {
-        const response = await fetch(getApiUrl('/leads/'));
-        const leads = await response.json();
+        const { items: leads, nextCursor } = await fetchPage('/leads/', cursor);
         
         const activeLeadsTableBody = document.getElementById('leadsTableBody');
         const convertedLeadsTableBody = document.getElementById('convertedLeadsTableBody');
         
-        activeLeadsTableBody.innerHTML = '';
-        convertedLeadsTableBody.innerHTML = '';
+        if (!cursor) {
+            activeLeadsTableBody.innerHTML = '';
+            convertedLeadsTableBody.innerHTML = '';
+        }
         
         leads.forEach(lead => {
             if (lead.status === 'CONVERTED') {
@@ -462,6 +569,7 @@ async function loadLeads() {
                 activeLeadsTableBody.appendChild(row);
             }
         });
+        renderLoadMore(activeLeadsTableBody, nextCursor, loadLeads);
     } catch (error) {
         console.error('Error loading leads:', error);
         showAlert('danger', 'Failed to load leads');
@@ -564,16 +672,14 @@ async function deleteLead(leadId) {
 }
 
 // Load functions
-async function loadVendors() {
+async function loadVendors(cursor = null) {
     const vendorsList = document.getElementById('vendorsList');
     if (!vendorsList) return;
 
     try {
-        const response = await fetch(getApiUrl('/vendors/'));
-        if (!response.ok) throw new Error('Failed to fetch vendors');
-        const vendors = await response.json();
+        const { items: vendors, nextCursor } = await fetchPage('/vendors/', cursor);
 
-        vendorsList.innerHTML = vendors.map(vendor => `
+        const rows = vendors.map(vendor => `
             <tr>
                 <td>${vendor.name}</td>
                 <td>${vendor.contact_name || '-'}</td>
@@ -585,22 +691,29 @@ async function loadVendors() {
                 </td>
             </tr>
         `).join('');
+        if (cursor) {
+            vendorsList.insertAdjacentHTML('beforeend', rows);
+        } else {
+            vendorsList.innerHTML = rows;
+        }
+        renderLoadMore(vendorsList, nextCursor, loadVendors);
     } catch (error) {
         console.error('Error loading vendors:', error);
         showAlert('Error loading vendors', 'danger');
     }
 }
 
-async function loadCustomers() {
-    fetch(getApiUrl('/customers/'))
-        .then(response => response.json())
-        .then(customers => {
+async function loadCustomers(cursor = null) {
+    fetchPage('/customers/', cursor)
+        .then(({ items: customers, nextCursor }) => {
             const tbody = document.getElementById('customersList');
             if (!tbody) {
                 console.error('Could not find customers list element');
                 return;
             }
-            tbody.innerHTML = '';
+            if (!cursor) {
+                tbody.innerHTML = '';
+            }
             customers.forEach(customer => {
                 const tr = document.createElement('tr');
                 tr.innerHTML = `
@@ -616,6 +729,7 @@ async function loadCustomers() {
                 `;
                 tbody.appendChild(tr);
             });
+            renderLoadMore(tbody, nextCursor, loadCustomers);
         })
         .catch(error => {
             console.error('Error:', error);
@@ -623,16 +737,14 @@ async function loadCustomers() {
         });
 }
 
-async function loadProjects() {
+async function loadProjects(cursor = null) {
     const projectsList = document.getElementById('projectsList');
     if (!projectsList) return;
 
     try {
-        const response = await fetch(getApiUrl('/projects/'));
-        if (!response.ok) throw new Error('Failed to fetch projects');
-        const projects = await response.json();
+        const { items: projects, nextCursor } = await fetchPage('/projects/', cursor);
 
-        projectsList.innerHTML = projects.map(project => `
+        const rows = projects.map(project => `
             <tr>
                 <td>${project.name}</td>
                 <td>${project.customer ? project.customer.name : 'N/A'}</td>
@@ -645,6 +757,12 @@ async function loadProjects() {
                 </td>
             </tr>
         `).join('');
+        if (cursor) {
+            projectsList.insertAdjacentHTML('beforeend', rows);
+        } else {
+            projectsList.innerHTML = rows;
+        }
+        renderLoadMore(projectsList, nextCursor, loadProjects);
     } catch (error) {
         console.error('Error loading projects:', error);
         showAlert('Error loading projects', 'danger');
@@ -654,11 +772,14 @@ async function loadProjects() {
 // Dashboard functions
 async function loadDashboardStats() {
     try {
-        const response = await fetch(getApiUrl('/api/dashboard/stats'));
-        if (!response.ok) {
-            throw new Error('Failed to fetch dashboard stats');
+        let stats = await takePrimed('/api/dashboard/stats');
+        if (!stats) {
+            const response = await fetch(getApiUrl('/api/dashboard/stats'));
+            if (!response.ok) {
+                throw new Error('Failed to fetch dashboard stats');
+            }
+            stats = await response.json();
         }
-        const stats = await response.json();
 
         // Update lead statistics
         document.getElementById('totalLeadsCount').textContent = stats.leads.total;
@@ -934,15 +1055,14 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     // Load Leads
-    async function loadLeads() {
+    async function loadLeads(cursor = null) {
         const leadsList = document.getElementById('leadsList');
         if (!leadsList) return;
 
         try {
-            const response = await fetch(getApiUrl('/leads/'));
-            const leads = await response.json();
+            const { items: leads, nextCursor } = await fetchPage('/leads/', cursor);
 
-            leadsList.innerHTML = leads.map(lead => `
+            const rows = leads.map(lead => `
                 <tr>
                     <td>${lead.name}</td>
                     <td>${lead.email}</td>
@@ -955,6 +1075,12 @@ document.addEventListener('DOMContentLoaded', function() {
                     </td>
                 </tr>
             `).join('');
+            if (cursor) {
+                leadsList.insertAdjacentHTML('beforeend', rows);
+            } else {
+                leadsList.innerHTML = rows;
+            }
+            renderLoadMore(leadsList, nextCursor, loadLeads);
         } catch (error) {
             showAlert('Error loading leads', 'danger');
         }
@@ -967,8 +1093,7 @@ document.addEventListener('DOMContentLoaded', function() {
         if (!customerSelect) return;
 
         try {
-            const customersResponse = await fetch(getApiUrl('/customers/'));
-            const customers = await customersResponse.json();
+            const customers = await getCustomerOptions();
 
             // Clear existing options
             customerSelect.innerHTML = '<option value="">Select Customer</option>';
@@ -987,20 +1112,15 @@ document.addEventListener('DOMContentLoaded', function() {
                     return;
                 }
 
-                try {
-                    const projectsResponse = await fetch(getApiUrl(`/customers/${customerId}/projects`));
-                    const projects = await projectsResponse.json();
-
-                    projectSelect.innerHTML = '<option value="">Select Project</option>';
-                    projects.forEach(project => {
-                        const option = document.createElement('option');
-                        option.value = project.id;
-                        option.textContent = project.name;
-                        projectSelect.appendChild(option);
-                    });
-                } catch (error) {
-                    showAlert('Error loading projects', 'danger');
-                }
+                // Grouped under the customer already, no request per selection
+                const customer = customers.find(c => c.id === parseInt(customerId));
+                projectSelect.innerHTML = '<option value="">Select Project</option>';
+                (customer ? customer.projects : []).forEach(project => {
+                    const option = document.createElement('option');
+                    option.value = project.id;
+                    option.textContent = project.name;
+                    projectSelect.appendChild(option);
+                });
             });
         } catch (error) {
             showAlert('Error loading customers', 'danger');
@@ -1014,8 +1134,7 @@ document.addEventListener('DOMContentLoaded', function() {
         if (!customerSelect) return;
 
         try {
-            const customersResponse = await fetch(getApiUrl('/customers/'));
-            const customers = await customersResponse.json();
+            const customers = await getCustomerOptions();
 
             // Clear existing options
             customerSelect.innerHTML = '<option value="">Select Customer</option>';
@@ -1034,20 +1153,15 @@ document.addEventListener('DOMContentLoaded', function() {
                     return;
                 }
 
-                try {
-                    const projectsResponse = await fetch(getApiUrl(`/customers/${customerId}/projects`));
-                    const projects = await projectsResponse.json();
-
-                    projectSelect.innerHTML = '<option value="">Select Project</option>';
-                    projects.forEach(project => {
-                        const option = document.createElement('option');
-                        option.value = project.id;
-                        option.textContent = project.name;
-                        projectSelect.appendChild(option);
-                    });
-                } catch (error) {
-                    showAlert('Error loading projects', 'danger');
-                }
+                // Grouped under the customer already, no request per selection
+                const customer = customers.find(c => c.id === parseInt(customerId));
+                projectSelect.innerHTML = '<option value="">Select Project</option>';
+                (customer ? customer.projects : []).forEach(project => {
+                    const option = document.createElement('option');
+                    option.value = project.id;
+                    option.textContent = project.name;
+                    projectSelect.appendChild(option);
+                });
             });
         } catch (error) {
             showAlert('Error loading customers', 'danger');
@@ -1060,15 +1174,15 @@ document.addEventListener('DOMContentLoaded', function() {
         if (!interactionsList) return;
 
         try {
-            const response = await fetch(getApiUrl('/interactions/'));
-            const interactions = await response.json();
+            const primed = await takePrimed('/interactions/');
+            const interactions = primed ? primed.items : await (await fetch(getApiUrl('/interactions/'))).json();
 
             interactionsList.innerHTML = interactions.map(interaction => `
                 <tr>
                     <td>${interaction.customer.name}</td>
                     <td>${interaction.project ? interaction.project.name : '-'}</td>
                     <td>${interaction.interaction_type}</td>
-                    <td>${new Date(interaction.date).toLocaleDateString()}</td>
+                    <td>${new Date(interaction.date || interaction.created_at).toLocaleDateString()}</td>
                     <td>${interaction.duration ? interaction.duration + ' min' : '-'}</td>
                     <td>
                         <button class="btn btn-primary btn-sm" onclick="window.viewInteraction(${interaction.id})">View</button>
@@ -1081,15 +1195,14 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     // Load Notifications
-    async function loadNotifications() {
+    async function loadNotifications(cursor = null) {
         const notificationsList = document.getElementById('notificationsList');
         if (!notificationsList) return;
 
         try {
-            const response = await fetch(getApiUrl('/notifications/'));
-            const notifications = await response.json();
+            const { items: notifications, nextCursor } = await fetchPage('/notifications/', cursor);
 
-            notificationsList.innerHTML = notifications.map(notification => `
+            const rows = notifications.map(notification => `
                 <tr>
                     <td>${notification.title}</td>
                     <td>${notification.type}</td>
@@ -1102,6 +1215,12 @@ document.addEventListener('DOMContentLoaded', function() {
                     </td>
                 </tr>
             `).join('');
+            if (cursor) {
+                notificationsList.insertAdjacentHTML('beforeend', rows);
+            } else {
+                notificationsList.innerHTML = rows;
+            }
+            renderLoadMore(notificationsList, nextCursor, loadNotifications);
         } catch (error) {
             showAlert('Error loading notifications', 'danger');
         }
@@ -1132,6 +1251,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 if (response.ok) {
                     showAlert('Customer added successfully!', 'success');
                     customerForm.reset();
+                    customerOptions = null;
                     loadCustomers();
                 } else {
                     const error = await response.json();
@@ -1171,6 +1291,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 if (response.ok) {
                     showAlert('Project created successfully!', 'success');
                     projectForm.reset();
+                    customerOptions = null;
                     loadProjects();
                 } else {
                     const error = await response.json();
@@ -1199,8 +1320,7 @@ document.addEventListener('DOMContentLoaded', function() {
         if (!customerSelect) return;
 
         try {
-            const response = await fetch(getApiUrl('/customers/'));
-            const customers = await response.json();
+            const customers = await getCustomerOptions();
 
             // Clear existing options except the first one
             customerSelect.innerHTML = '<option value="">Select Customer</option>';
@@ -1216,6 +1336,50 @@ document.addEventListener('DOMContentLoaded', function() {
             showAlert('Error loading customers for selection', 'danger');
         }
     }
+
+    // Live updates from /events instead of refetching the lists on a timer.
+    // EventSource reconnects by itself and sends Last-Event-ID, so events
+    // published while it was away are replayed by the server.
+    function isSectionVisible(id) {
+        const section = document.getElementById(id);
+        return section && section.style.display !== 'none';
+    }
+
+    const pendingRefreshes = {};
+    function refreshSoon(key, load) {
+        // A batch of queued website forms arrives as a burst: reload once
+        clearTimeout(pendingRefreshes[key]);
+        pendingRefreshes[key] = setTimeout(() => load(), 250);
+    }
+
+    function refreshLeadViews() {
+        if (isSectionVisible('leads')) refreshSoon('leads', loadLeads);
+        if (isSectionVisible('dashboard')) refreshSoon('dashboard', loadDashboardStats);
+    }
+
+    function refreshNotificationViews() {
+        if (isSectionVisible('notifications')) refreshSoon('notifications', loadNotifications);
+    }
+
+    if (window.EventSource) {
+        const liveEvents = new EventSource(getApiUrl('/events'));
+        liveEvents.addEventListener('lead.created', event => {
+            const lead = JSON.parse(event.data);
+            showAlert('info', `New lead: ${lead.name}`);
+            refreshLeadViews();
+        });
+        liveEvents.addEventListener('lead.status', refreshLeadViews);
+        liveEvents.addEventListener('notification.created', refreshNotificationViews);
+        liveEvents.addEventListener('notification.due', event => {
+            const reminder = JSON.parse(event.data);
+            showAlert('warning', `Reminder: ${reminder.title}`);
+        });
+        // The server could not replay what was missed (restart, or too far behind)
+        liveEvents.addEventListener('resync', () => {
+            refreshLeadViews();
+            refreshNotificationViews();
+        });
+    }
 });
 
 document.querySelectorAll('.nav-link').forEach(link => {
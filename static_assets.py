@@ -0,0 +1,137 @@
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+from typing import Dict, NamedTuple, Optional
+
+from jinja2 import Environment
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response
+from starlette.types import Receive, Scope, Send
+
+import conditional
+
+try:
+    import brotli
+except ImportError:  # gzip alone still covers every browser
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# An encoded variant is kept only if it is at most this fraction of the
+# original's size; one that saves less is not worth the decoding
+MIN_COMPRESSION_RATIO = 0.9
+
+
+class EncodedBody(NamedTuple):
+    media_type: str
+    etag: str
+    variants: Dict[str, bytes]  # content-coding ("identity", "gzip", "br") -> bytes
+
+
+def encode_body(body: bytes, media_type: str) -> EncodedBody:
+    variants = {"identity": body}
+    compressed = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        compressed["br"] = brotli.compress(body, quality=11)
+    for coding, data in compressed.items():
+        if len(data) <= len(body) * MIN_COMPRESSION_RATIO:
+            variants[coding] = data
+    etag = '"' + hashlib.sha256(body).hexdigest()[:20] + '"'
+    return EncodedBody(media_type, etag, variants)
+
+
+def accepted_codings(accept_encoding: str) -> Dict[str, float]:
+    codings = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            codings[name.strip().lower()] = quality
+    return codings
+
+
+def choose_coding(request: Request, body: EncodedBody) -> str:
+    accepted = accepted_codings(request.headers.get("accept-encoding", ""))
+    for coding in ("br", "gzip"):
+        if coding in body.variants and accepted.get(coding, accepted.get("*", 0)) > 0:
+            return coding
+    return "identity"
+
+
+def encoded_response(request: Request, body: EncodedBody, cache_control: str) -> Response:
+    headers = {
+        "ETag": body.etag,
+        "Cache-Control": cache_control,
+        "Vary": "Accept-Encoding",
+        "Access-Control-Allow-Origin": "*",
+    }
+    # Weak tags and lists of tags match too
+    if conditional.is_not_modified(request, conditional.Validators(body.etag, None)):
+        return Response(status_code=304, headers=headers)
+
+    coding = choose_coding(request, body)
+    if coding != "identity":
+        headers["Content-Encoding"] = coding
+    return Response(body.variants[coding], media_type=body.media_type, headers=headers)
+
+
+class AssetStore:
+    # Fingerprinted copies of everything under the static directory, held in
+    # memory together with their gzip/brotli variants. Built once at startup;
+    # a file only changes by getting a new name, so responses are immutable.
+
+    def __init__(self, directory: str, url_prefix: str = "/assets"):
+        self.directory = directory
+        self.url_prefix = url_prefix
+        self.assets: Dict[str, EncodedBody] = {}
+        self.urls: Dict[str, str] = {}
+        self.build()
+
+    def build(self):
+        for root, _, files in os.walk(self.directory):
+            for filename in files:
+                path = os.path.join(root, filename)
+                logical = os.path.relpath(path, self.directory).replace(os.sep, "/")
+                with open(path, "rb") as asset_file:
+                    data = asset_file.read()
+                stem, extension = os.path.splitext(logical)
+                hashed = f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{extension}"
+                media_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+                self.assets[hashed] = encode_body(data, media_type)
+                self.urls[logical] = f"{self.url_prefix}/{hashed}"
+        logger.info(f"Built {len(self.assets)} static assets")
+
+    def url_for(self, path: str) -> str:
+        # Files added after startup still resolve, just without fingerprinting
+        return self.urls.get(path, f"/static/{path}")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        request = Request(scope, receive)
+        asset = self.assets.get(scope["path"].lstrip("/"))
+        if asset is None or request.method not in ("GET", "HEAD"):
+            response = PlainTextResponse("Not Found", status_code=404)
+        else:
+            response = encoded_response(request, asset, IMMUTABLE)
+        await response(scope, receive, send)
+
+
+class SpaShell:
+    # The landing page has no per-request data, so it is rendered once and
+    # served from memory; clients revalidate it by ETag on every load
+
+    def __init__(self, environment: Environment, template: str, assets: AssetStore):
+        html = environment.get_template(template).render(asset_url=assets.url_for)
+        self.body = encode_body(html.encode(), "text/html; charset=utf-8")
+
+    def response(self, request: Request) -> Response:
+        return encoded_response(request, self.body, REVALIDATE)
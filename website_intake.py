@@ -0,0 +1,426 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import dashboard_stats
+import idempotency
+import live_events
+import models
+import schemas
+from database import AsyncSessionLocal
+from reminders import OPEN_LEAD_STATUSES
+
+logger = logging.getLogger(__name__)
+
+# "direct" writes the lead during the request; "queue" appends the submission
+# to a local outbox and answers 202 while a background worker writes it
+WEBSITE_FORM_MODE = os.getenv("WEBSITE_FORM_MODE", "direct").lower()
+WEBSITE_FORM_QUEUE_PATH = os.getenv("WEBSITE_FORM_QUEUE_PATH", "./website_form_queue.db")
+WEBSITE_FORM_BATCH_SIZE = int(os.getenv("WEBSITE_FORM_BATCH_SIZE", "200"))
+WEBSITE_FORM_POLL_SECONDS = float(os.getenv("WEBSITE_FORM_POLL_SECONDS", "1.0"))
+WEBSITE_FORM_MAX_ATTEMPTS = int(os.getenv("WEBSITE_FORM_MAX_ATTEMPTS", "5"))
+# Open leads remembered by email, so a repeat submission skips the lookup
+LEAD_EMAIL_CACHE_SIZE = int(os.getenv("LEAD_EMAIL_CACHE_SIZE", "10000"))
+
+# A claim older than this is considered abandoned by a crashed worker
+CLAIM_TIMEOUT_SECONDS = 300
+# Failed submissions are retried after 5s, 10s, 20s, ... capped at this
+MAX_RETRY_DELAY_SECONDS = 300
+
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+
+def build_lead(form_data: schemas.WebsiteFormData) -> models.Lead:
+    return models.Lead(
+        name=form_data.name,
+        email=normalize_email(form_data.email),
+        phone=form_data.phone,
+        address=form_data.address,
+        description=form_data.message,
+        project_type=form_data.project_type,
+        # The form's free-text source ("Website Contact Form", ...) is kept in the notification title
+        source=models.LeadSource.WEBSITE,
+        status=models.LeadStatus.NEW,
+        created_at=datetime.utcnow()
+    )
+
+
+def build_notification(form_data: schemas.WebsiteFormData, repeat: bool = False) -> models.Notification:
+    if repeat:
+        title = f"Repeat inquiry from {form_data.source}: {form_data.name}"
+        description = f"{form_data.name} ({form_data.email}) submitted the contact form again"
+    else:
+        title = f"New Lead from {form_data.source}: {form_data.name}"
+        description = f"New contact form submission from {form_data.name} ({form_data.email})"
+    return models.Notification(
+        type=models.NotificationType.LEAD,
+        title=title,
+        description=description,
+        due_date=datetime.utcnow() + timedelta(days=1)
+    )
+
+
+def appended_message(description: Optional[str], message: Optional[str]) -> Optional[str]:
+    if not message:
+        return description
+    return f"{description}\n\n{message}" if description else message
+
+
+class LeadEmailCache:
+    # Email -> id of the open lead a repeat submission updates. An entry is
+    # forgotten when its lead is deleted, converted or moved out of the open
+    # statuses, and the whole cache is cleared when leads are purged or the
+    # database reset. Other workers' caches miss those calls, so
+    # update_open_lead re-checks the email and OPEN_LEAD_STATUSES and
+    # updates nothing for an entry gone stale.
+
+    def __init__(self, cache_size: int = LEAD_EMAIL_CACHE_SIZE):
+        self.cache = idempotency.ExpiringLRU(cache_size)
+
+    async def find(self, db: AsyncSession, emails: set) -> dict:
+        found = {}
+        for email in emails:
+            lead_id = self.cache.get(email)
+            if lead_id is not None:
+                found[email] = lead_id
+        missing = emails - found.keys()
+        if missing:
+            # Newest open lead per email, on the leads.email index
+            result = await db.execute(
+                select(models.Lead.email, models.Lead.id).where(
+                    models.Lead.email.in_(missing),
+                    models.Lead.status.in_(OPEN_LEAD_STATUSES)
+                ).order_by(models.Lead.id)
+            )
+            for email, lead_id in result.all():
+                found[email] = lead_id
+                self.cache.put(email, lead_id)
+        return found
+
+    def remember(self, email: str, lead_id: int):
+        self.cache.put(email, lead_id)
+
+    def forget(self, email: str):
+        self.cache.discard(email)
+
+    def clear(self):
+        # After bulk deletes: ids are reused once their leads are gone
+        self.cache.entries.clear()
+
+
+lead_email_cache = LeadEmailCache()
+
+
+async def update_open_lead(db: AsyncSession, lead_id: int, email: str, form_data: schemas.WebsiteFormData) -> bool:
+    # One UPDATE, no read: blanks on the form keep what the lead has, and
+    # the message is appended to its description. Matching the email too
+    # means a stale cached id (its lead deleted, the id reused) updates
+    # nothing rather than someone else's lead.
+    values = {
+        "phone": func.coalesce(form_data.phone, models.Lead.phone),
+        "address": func.coalesce(form_data.address, models.Lead.address),
+        "project_type": func.coalesce(form_data.project_type, models.Lead.project_type),
+        "updated_at": datetime.utcnow()
+    }
+    if form_data.message:
+        values["description"] = func.coalesce(models.Lead.description + "\n\n", "") + form_data.message
+    result = await db.execute(
+        update(models.Lead)
+        .where(
+            models.Lead.id == lead_id,
+            models.Lead.email == email,
+            models.Lead.status.in_(OPEN_LEAD_STATUSES)
+        )
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount > 0
+
+
+async def write_batch(db: AsyncSession, forms: List[schemas.WebsiteFormData], keys: List[Optional[str]]) -> List[int]:
+    now = datetime.utcnow()
+    emails = [normalize_email(form_data.email) for form_data in forms]
+    open_leads = await lead_email_cache.find(db, set(emails))
+
+    new_leads = {}
+    notifications = []
+    written = []
+    for form_data, email in zip(forms, emails):
+        lead = new_leads.get(email)
+        if lead is not None:
+            # The same person twice in one batch: fold into the new lead
+            lead.phone = form_data.phone or lead.phone
+            lead.address = form_data.address or lead.address
+            lead.project_type = form_data.project_type or lead.project_type
+            lead.description = appended_message(lead.description, form_data.message)
+            written.append(lead)
+            notifications.append(build_notification(form_data, repeat=True))
+            continue
+        lead_id = open_leads.get(email)
+        if lead_id is not None:
+            if await update_open_lead(db, lead_id, email, form_data):
+                written.append(lead_id)
+                notifications.append(build_notification(form_data, repeat=True))
+                continue
+            lead_email_cache.forget(email)
+        lead = build_lead(form_data)
+        new_leads[email] = lead
+        written.append(lead)
+        notifications.append(build_notification(form_data))
+
+    db.add_all(new_leads.values())
+    db.add_all(notifications)
+    await dashboard_stats.adjust_counter(db, dashboard_stats.LEADS, models.LeadStatus.NEW, len(new_leads))
+    if any(keys):
+        # The keys need the new leads' ids
+        await db.flush()
+        await idempotency.store.purge_expired(db, now)
+        for key, lead in zip(keys, written):
+            if key is not None:
+                idempotency.store.record(db, key, lead if isinstance(lead, int) else lead.id, now)
+    await db.commit()
+
+    lead_ids = [lead if isinstance(lead, int) else lead.id for lead in written]
+    for email, lead_id in zip(emails, lead_ids):
+        lead_email_cache.remember(email, lead_id)
+    for lead in new_leads.values():
+        live_events.publish("lead.created", live_events.lead_event(lead))
+    for notification in notifications:
+        live_events.publish("notification.created", live_events.notification_event(notification))
+    return lead_ids
+
+
+# Leads, their notifications, the idempotency keys and the counter update go
+# out in one transaction. Returns the lead id each submission was written to:
+# a new lead, or the open lead with the same email that it updated.
+async def write_submissions(
+    db: AsyncSession,
+    forms: List[schemas.WebsiteFormData],
+    keys: Optional[List[Optional[str]]] = None
+) -> List[int]:
+    keys = keys or [None] * len(forms)
+    # A key twice in one batch (a retry queued by another worker) is written once
+    first_index = {}
+    for index, key in enumerate(keys):
+        if key is not None:
+            first_index.setdefault(key, index)
+    unique = [index for index, key in enumerate(keys) if key is None or first_index[key] == index]
+
+    try:
+        lead_ids = await write_batch(db, [forms[i] for i in unique], [keys[i] for i in unique])
+        by_index = dict(zip(unique, lead_ids))
+    except IntegrityError:
+        # A key already in the table: written meanwhile by another worker,
+        # or expired but not yet purged. Rare enough to pay a rollback for.
+        await db.rollback()
+        if not any(keys):
+            raise
+        written_keys = [keys[i] for i in unique if keys[i] is not None]
+        await idempotency.store.purge_expired(db, datetime.utcnow(), written_keys)
+        await db.commit()
+        stored = await idempotency.store.stored(db, written_keys)
+        fresh = [i for i in unique if keys[i] not in stored]
+        lead_ids = await write_batch(db, [forms[i] for i in fresh], [keys[i] for i in fresh]) if fresh else []
+        by_index = dict(zip(fresh, lead_ids))
+        by_index.update((i, stored[keys[i]]) for i in unique if keys[i] in stored)
+    return [by_index[first_index[key]] if key is not None else by_index[index] for index, key in enumerate(keys)]
+
+
+class WebsiteFormQueue:
+    # Durable outbox in a local SQLite file. Appends are a single small insert,
+    # so the request path never touches the main database or its pool.
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " payload TEXT NOT NULL,"
+            " enqueued_at REAL NOT NULL,"
+            " claimed_at REAL,"
+            " available_at REAL NOT NULL DEFAULT 0,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " last_error TEXT)"
+        )
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(outbox)")}
+        if "idempotency_key" not in columns:
+            # Outbox files from before submissions carried their key
+            self.connection.execute("ALTER TABLE outbox ADD COLUMN idempotency_key TEXT")
+
+    def append(self, form_data: schemas.WebsiteFormData, idempotency_key: Optional[str] = None) -> int:
+        with self.lock:
+            cursor = self.connection.execute(
+                "INSERT INTO outbox (payload, enqueued_at, idempotency_key) VALUES (?, ?, ?)",
+                (form_data.json(), time.time(), idempotency_key)
+            )
+            return cursor.lastrowid
+
+    def claim(self, limit: int) -> list:
+        # BEGIN IMMEDIATE takes the write lock up front, so two processes
+        # draining the same file never claim the same rows
+        now = time.time()
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self.connection.execute(
+                    "SELECT id, payload, idempotency_key FROM outbox"
+                    " WHERE attempts < ? AND available_at <= ? AND (claimed_at IS NULL OR claimed_at < ?)"
+                    " ORDER BY id LIMIT ?",
+                    (WEBSITE_FORM_MAX_ATTEMPTS, now, now - CLAIM_TIMEOUT_SECONDS, limit)
+                ).fetchall()
+                self.connection.executemany(
+                    "UPDATE outbox SET claimed_at = ? WHERE id = ?",
+                    [(now, row[0]) for row in rows]
+                )
+                self.connection.execute("COMMIT")
+            except Exception:
+                self.connection.execute("ROLLBACK")
+                raise
+        return rows
+
+    def complete(self, ids: List[int]):
+        with self.lock:
+            self.connection.executemany("DELETE FROM outbox WHERE id = ?", [(i,) for i in ids])
+
+    def fail(self, queue_id: int, error: str):
+        with self.lock:
+            attempts = self.connection.execute(
+                "SELECT attempts FROM outbox WHERE id = ?", (queue_id,)
+            ).fetchone()[0]
+            retry_delay = min(5 * 2 ** attempts, MAX_RETRY_DELAY_SECONDS)
+            self.connection.execute(
+                "UPDATE outbox SET claimed_at = NULL, available_at = ?, attempts = attempts + 1, last_error = ?"
+                " WHERE id = ?",
+                (time.time() + retry_delay, error, queue_id)
+            )
+
+    def stats(self) -> dict:
+        with self.lock:
+            depth, oldest = self.connection.execute(
+                "SELECT COUNT(*), MIN(enqueued_at) FROM outbox WHERE attempts < ?",
+                (WEBSITE_FORM_MAX_ATTEMPTS,)
+            ).fetchone()
+            dead = self.connection.execute(
+                "SELECT COUNT(*) FROM outbox WHERE attempts >= ?",
+                (WEBSITE_FORM_MAX_ATTEMPTS,)
+            ).fetchone()[0]
+        return {
+            "depth": depth,
+            "lag_seconds": round(time.time() - oldest, 3) if oldest else 0.0,
+            "dead_letters": dead
+        }
+
+
+class WebsiteFormWorker:
+    def __init__(self, queue: WebsiteFormQueue):
+        self.queue = queue
+        self.wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.processed = 0
+        self.failed = 0
+        self.last_batch_at: Optional[datetime] = None
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    def notify(self):
+        self.wakeup.set()
+
+    async def run(self):
+        logger.info("Website form worker started")
+        while True:
+            try:
+                drained = await self.drain_once()
+            except Exception as e:
+                logger.error(f"Website form worker error: {str(e)}")
+                drained = 0
+            if drained < WEBSITE_FORM_BATCH_SIZE:
+                # Sleep until a local submission arrives, or poll for ones
+                # appended by other worker processes
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=WEBSITE_FORM_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                self.wakeup.clear()
+
+    async def drain_once(self) -> int:
+        loop = asyncio.get_running_loop()
+        rows = await loop.run_in_executor(None, self.queue.claim, WEBSITE_FORM_BATCH_SIZE)
+        if not rows:
+            return 0
+
+        entries = []
+        for queue_id, payload, idempotency_key in rows:
+            try:
+                entries.append((queue_id, schemas.WebsiteFormData.parse_raw(payload), idempotency_key))
+            except Exception as e:
+                self.failed += 1
+                await loop.run_in_executor(None, self.queue.fail, queue_id, str(e))
+
+        async with AsyncSessionLocal() as db:
+            try:
+                await write_submissions(db, [form_data for _, form_data, _ in entries], [key for _, _, key in entries])
+                done = [queue_id for queue_id, _, _ in entries]
+            except Exception as e:
+                await db.rollback()
+                logger.warning(f"Website form batch of {len(entries)} failed ({str(e)}), retrying one by one")
+                done = []
+                for queue_id, form_data, idempotency_key in entries:
+                    try:
+                        await write_submissions(db, [form_data], [idempotency_key])
+                        done.append(queue_id)
+                    except Exception as row_error:
+                        await db.rollback()
+                        self.failed += 1
+                        await loop.run_in_executor(None, self.queue.fail, queue_id, str(row_error))
+
+        await loop.run_in_executor(None, self.queue.complete, done)
+        self.processed += len(done)
+        self.last_batch_at = datetime.utcnow()
+        return len(rows)
+
+    def stats(self) -> dict:
+        return {
+            "mode": WEBSITE_FORM_MODE,
+            "running": self.task is not None and not self.task.done(),
+            "processed": self.processed,
+            "failed": self.failed,
+            "last_batch_at": self.last_batch_at,
+            **self.queue.stats()
+        }
+
+
+website_form_worker: Optional[WebsiteFormWorker] = None
+
+
+def get_website_form_worker() -> Optional[WebsiteFormWorker]:
+    # None in direct mode, which never creates or opens the outbox file
+    global website_form_worker
+    if website_form_worker is None and WEBSITE_FORM_MODE == "queue":
+        website_form_worker = WebsiteFormWorker(WebsiteFormQueue(WEBSITE_FORM_QUEUE_PATH))
+    return website_form_worker